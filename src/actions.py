@@ -1,147 +1,416 @@
-from datetime import date, datetime
+import hashlib
+import json
+import math
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List
-
-from . import db
-from .config import REPORTS_DIR
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from . import categorizer, db, scheduler
+from .config import AUTO_CATEGORIZE, REPORTS_DIR
+from .profiling import profile_request
+from .recurrence import first_occurrence, format_rule, next_occurrence, parse_rule
+from .safety import DESTRUCTIVE_ACTIONS
+from .results import (
+    PANEL_BILLS,
+    PANEL_BUDGET,
+    PANEL_EXPENSES,
+    PANEL_HEALTH,
+    PANEL_SAVINGS,
+    ActionResult,
+    BillAdded,
+    BillList,
+    BillSummary,
+    BudgetAlert,
+    BudgetStatus,
+    ExpenseAdded,
+    ExpenseList,
+    ExpenseSummary,
+    HealthCheck,
+    Message,
+    RecurringBillAdded,
+    ReportCreated,
+    SavingsPlan,
+)
+
+BUDGET_ALERT_THRESHOLDS = (1.0, 0.8)
+PERIODS = ("today", "this_week", "this_month", "all")
+
+
+class Param(NamedTuple):
+    name: str
+    type: str  # "number" | "integer" | "string" | "boolean" | "date" | "month"
+    default: Any = None
+    required: bool = False
+    choices: Tuple[str, ...] = ()
+    doc: str = ""
+    positive: bool = False
+
+
+class ActionSpec(NamedTuple):
+    handler: Callable[[Dict[str, Any]], Union[ActionResult, List[ActionResult]]]
+    summary: str
+    params: Tuple[Param, ...] = ()
+
+
+def _to_number(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError("expected a number")
+    if isinstance(value, str):
+        # LLMs sometimes group thousands: "45,000".
+        value = value.strip().replace(",", "").replace("_", "")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("expected a number") from None
+    if not math.isfinite(number):
+        raise ValueError("expected a finite number")
+    return number
+
+
+def _to_integer(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError("expected an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip().lstrip("#"))
+        except ValueError:
+            pass
+    raise ValueError("expected an integer")
+
+
+def _to_string(value: Any) -> Optional[str]:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError("expected a string")
+    # Blank strings count as missing.
+    return str(value).strip() or None
+
+
+_TRUE = {"true", "yes", "1"}
+_FALSE = {"false", "no", "0"}
+
+
+def _to_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+    raise ValueError("expected true or false")
+
+
+def _to_date(value: Any) -> str:
+    text = str(value).strip()
+    try:
+        # fromisoformat is much faster than strptime for the usual shape;
+        # strptime also accepts unpadded dates like 2026-1-5.
+        if len(text) == 10:
+            return date.fromisoformat(text).isoformat()
+        return datetime.strptime(text, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError("expected a date (YYYY-MM-DD)") from None
 
 
-def execute_actions(actions: List[Dict[str, Any]]) -> List[str]:
-    results: List[str] = []
+def _to_month(value: Any) -> str:
+    # Accepts YYYY-MM or a full date inside the month.
+    text = str(value).strip()[:7]
+    try:
+        if len(text) == 7:
+            return date.fromisoformat(text + "-01").isoformat()[:7]
+        return datetime.strptime(text, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise ValueError("expected a month (YYYY-MM)") from None
+
+
+_COERCE: Dict[str, Callable[[Any], Any]] = {
+    "number": _to_number,
+    "integer": _to_integer,
+    "string": _to_string,
+    "boolean": _to_boolean,
+    "date": _to_date,
+    "month": _to_month,
+}
+
+Validator = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], List[str]]]
+
+
+def _compile_validator(params: Tuple[Param, ...]) -> Validator:
+    # Turns an action's parameter specs into one function that returns the
+    # normalized params (every declared name present, typed, defaults
+    # filled in, unknown names dropped) and the list of problems found.
+    fields = tuple(
+        (
+            p.name,
+            _COERCE[p.type],
+            p.default,
+            p.required,
+            frozenset(p.choices),
+            p.positive,
+        )
+        for p in params
+    )
 
+    def validate(raw: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        normalized: Dict[str, Any] = {}
+        errors: List[str] = []
+        for name, coerce, default, required, choices, positive in fields:
+            value = raw.get(name)
+            if value is not None:
+                try:
+                    value = coerce(value)
+                except ValueError as e:
+                    errors.append(f"{name}: {e}, got {raw[name]!r}")
+                    continue
+            if value is None:
+                if required:
+                    errors.append(f"{name}: missing")
+                normalized[name] = default
+                continue
+            if choices:
+                value = value.lower()
+                if value not in choices:
+                    expected = "|".join(sorted(choices))
+                    errors.append(f"{name}: expected one of {expected}, got {raw[name]!r}")
+                    continue
+            if positive and value <= 0:
+                errors.append(f"{name}: must be greater than 0, got {raw[name]!r}")
+                continue
+            normalized[name] = value
+        return normalized, errors
+
+    return validate
+
+
+def normalize_actions(actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Checks the whole plan before anything runs and returns it with
+    # normalized params. Raises ValueError listing every problem found.
+    normalized: List[Dict[str, Any]] = []
+    problems: List[str] = []
+    for index, action in enumerate(actions, start=1):
+        atype = action.get("type") if isinstance(action, dict) else None
+        validate = VALIDATORS.get(atype)
+        if validate is None:
+            problems.append(f"action {index}: unsupported action type: {atype}")
+            continue
+        raw = action.get("params") or {}
+        if not isinstance(raw, dict):
+            problems.append(f"action {index} ({atype}): params must be an object")
+            continue
+        params, errors = validate(raw)
+        problems.extend(f"action {index} ({atype}): {error}" for error in errors)
+        normalized.append({"type": atype, "params": params})
+    if problems:
+        raise ValueError("Invalid plan: " + "; ".join(problems))
+    return normalized
+
+
+IDEMPOTENCY_PARAM = "idempotency_key"
+
+
+def idempotency_keys(request_id: str, actions: List[Dict[str, Any]]) -> List[str]:
+    # One key per action: the request id plus a hash of the normalized
+    # action. Identical actions in one plan ("two coffees") are told apart by
+    # their occurrence number, so a re-planned retry that reorders the
+    # actions still maps each one to its first run.
+    keys = []
+    seen: Dict[str, int] = {}
     for action in actions:
-        atype = action.get("type")
-        params: Dict[str, Any] = action.get("params") or {}
-
-        if atype == "add_expense":
-            results.append(_handle_add_expense(params))
-        elif atype == "list_expenses":
-            results.append(_handle_list_expenses(params))
-        elif atype == "summarize_expenses":
-            results.append(_handle_summarize_expenses(params))
-        elif atype == "add_bill":
-            results.append(_handle_add_bill(params))
-        elif atype == "list_bills":
-            results.append(_handle_list_bills(params))
-        elif atype == "summarize_bills":
-            results.append(_handle_summarize_bills(params))
-        elif atype == "generate_report_file":
-            results.append(_handle_generate_report_file(params))
-        elif atype == "delete_expense":
-            results.append(_handle_delete_expense(params))
-        elif atype == "mark_bill_paid":
-            results.append(_handle_mark_bill_paid(params))
-        elif atype == "plan_savings_goal":
-            results.append(_handle_plan_savings_goal(params))
-        elif atype == "spending_health_check":
-            results.append(_handle_spending_health_check(params))
-        else:
-            results.append(f"Skipping unsupported action type: {atype}")
+        content = json.dumps(action, sort_keys=True, ensure_ascii=False, default=str)
+        occurrence = seen.get(content, 0)
+        seen[content] = occurrence + 1
+        digest = hashlib.sha256(f"{request_id}\0{occurrence}\0{content}".encode("utf-8"))
+        keys.append(digest.hexdigest())
+    return keys
+
+
+def execute_actions(
+    actions: List[Dict[str, Any]], request_id: Optional[str] = None
+) -> List[ActionResult]:
+    # With a ``request_id``, inserts are idempotent: running the same plan
+    # again for that request writes nothing twice.
+    results: List[ActionResult] = []
+
+    normalized = normalize_actions(actions)
+    keys = idempotency_keys(request_id, normalized) if request_id else [None] * len(normalized)
+    with profile_request(request_id):
+        for action, key in zip(normalized, keys):
+            params = action["params"]
+            if key is not None:
+                params = dict(params, **{IDEMPOTENCY_PARAM: key})
+            outcome = ACTIONS[action["type"]].handler(params)
+            if isinstance(outcome, list):
+                results.extend(outcome)
+            else:
+                results.append(outcome)
 
     return results
 
 
-def _handle_add_expense(params: Dict[str, Any]) -> str:
-    amount = float(params.get("amount", 0))
-    currency = params.get("currency", "VND")
-    category = params.get("category")
-    description = params.get("description")
-    date_str = params.get("date")
+def _handle_add_expense(params: Dict[str, Any]) -> List[ActionResult]:
+    amount = params["amount"]
+    currency = params["currency"]
+    category = params["category"]
+    description = params["description"]
+    date_str = params["date"] or date.today().isoformat()
 
-    expense_id = db.add_expense(
-        amount=amount,
-        currency=currency,
-        category=category,
-        description=description,
-        date_str=date_str,
-    )
-    return (
-        f"Added expense #{expense_id}: {amount} {currency}, "
-        f"category='{category}', description='{description}'."
-    )
+    if AUTO_CATEGORIZE:
+        model = categorizer.for_tenant()
+        if category:
+            category = categorizer.canonical_label(category)
+            model.learn(description, category)
+        else:
+            category = model.categorize(description)
 
+    try:
+        expense_id, spent = db.add_expense(
+            amount=amount,
+            currency=currency,
+            category=category,
+            description=description,
+            date_str=date_str,
+            idempotency_key=params.get(IDEMPOTENCY_PARAM),
+        )
+    except db.DuplicateWrite as e:
+        return [_duplicate_message("Expense", e.record_id, PANEL_EXPENSES)]
+    results: List[ActionResult] = [
+        ExpenseAdded(expense_id, amount, currency, category, description)
+    ]
+    results.extend(_budget_alerts(category, date_str[:7], currency, amount, spent))
+    return results
 
-def _handle_list_expenses(params: Dict[str, Any]) -> str:
-    limit = int(params.get("limit", 10))
-    rows = db.list_expenses(limit=limit)
 
-    if not rows:
-        return "There are currently no recorded expenses."
+def _duplicate_message(what: str, record_id: int, panel: str) -> ActionResult:
+    return Message(
+        f"{what} #{record_id} was already added by this request; nothing was written again.",
+        panel=panel,
+    )
 
-    lines = ["Recent expenses:"]
-    for r in rows:
-        lines.append(
-            f"- #{r['id']} | {r['date']} | {r['amount']} {r['currency']} | "
-            f"{r['category'] or 'N/A'} | {r['description'] or ''}"
-        )
-    return "\n".join(lines)
 
+def _handle_list_expenses(params: Dict[str, Any]) -> ActionResult:
+    limit = params["limit"]
+    rows = db.list_expenses(limit=limit)
+    return ExpenseList(rows, "There are currently no recorded expenses.")
 
-def _handle_summarize_expenses(params: Dict[str, Any]) -> str:
-    period = params.get("period", "this_month")
-    rows = db.get_expenses(period=period, start_date=None, end_date=None)
 
-    if not rows:
-        return f"No expenses found for period '{period}'."
+def _handle_summarize_expenses(params: Dict[str, Any]) -> ActionResult:
+    period = params["period"]
+    # Aggregated in SQL; archived years are answered from their rollups.
+    rows = db.expense_totals_by_category(*db.period_range(period))
 
+    count = 0
     total = 0.0
     by_category: Dict[str, float] = {}
 
     for r in rows:
-        amt = float(r["amount"])
+        amt = float(r["total"])
+        count += r["count"]
         total += amt
-        cat = r["category"] or "Other"
-        by_category[cat] = by_category.get(cat, 0.0) + amt
-
-    lines = [
-        f"Expense summary (period='{period}'):" ,
-        f"- Number of expenses: {len(rows)}",
-        f"- Total amount: {total:.0f} VND",
-        "- By category:",
-    ]
-    for cat, value in by_category.items():
-        lines.append(f"  * {cat}: {value:.0f} VND")
-    return "\n".join(lines)
+        # Label variants ("cafe", "Coffee") are summed under one category.
+        category = categorizer.canonical_label(r["category"])
+        by_category[category] = by_category.get(category, 0.0) + amt
 
+    return ExpenseSummary(period, count, total, by_category)
 
-def _handle_add_bill(params: Dict[str, Any]) -> str:
-    name = params.get("name") or "Bill"
-    amount = float(params.get("amount", 0))
-    currency = params.get("currency", "VND")
-    due_date = params.get("due_date") or ""
-    notes = params.get("notes")
 
-    bill_id = db.add_bill(
-        name=name, amount=amount, currency=currency, due_date=due_date, notes=notes
-    )
-    return f"Added bill #{bill_id}: {name}, {amount} {currency}, due {due_date}."
+def _handle_add_bill(params: Dict[str, Any]) -> ActionResult:
+    name = params["name"]
+    amount = params["amount"]
+    currency = params["currency"]
+    due_date = params["due_date"]
+    notes = params["notes"]
+
+    try:
+        bill_id = db.add_bill(
+            name=name,
+            amount=amount,
+            currency=currency,
+            due_date=due_date,
+            notes=notes,
+            idempotency_key=params.get(IDEMPOTENCY_PARAM),
+        )
+    except db.DuplicateWrite as e:
+        return _duplicate_message("Bill", e.record_id, PANEL_BILLS)
+    return BillAdded(bill_id, name, amount, currency, due_date)
 
 
-def _handle_list_bills(params: Dict[str, Any]) -> str:
-    include_paid = bool(params.get("include_paid", False))
+def _handle_list_bills(params: Dict[str, Any]) -> ActionResult:
+    include_paid = params["include_paid"]
     rows = db.list_bills(include_paid=include_paid)
+    empty = "There are no bills in the system." if include_paid else "There are no unpaid bills."
+    return BillList("Bills:", rows, empty)
 
-    if not rows:
-        if include_paid:
-            return "There are no bills in the system."
-        return "There are no unpaid bills."
 
-    lines = ["Bills:"]
-    for r in rows:
-        status = "Paid" if r["is_paid"] else "Unpaid"
-        lines.append(
-            f"- #{r['id']} | {r['name']} | {r['amount']} {r['currency']} | "
-            f"Due: {r['due_date']} | {status}"
+def _handle_add_recurring_bill(params: Dict[str, Any]) -> ActionResult:
+    name = params["name"]
+    amount = params["amount"]
+    currency = params["currency"]
+    notes = params["notes"]
+    end_raw = params["end_date"]
+
+    try:
+        rule = parse_rule(params["frequency"])
+    except ValueError as e:
+        return Message(f"Cannot add recurring bill: {e}", ok=False)
+
+    start_raw = params["start_date"]
+    start = date.fromisoformat(start_raw) if start_raw else date.today()
+    end = date.fromisoformat(end_raw) if end_raw else None
+
+    first_due = first_occurrence(rule, start)
+    if end is not None and end < first_due:
+        return Message("Cannot add recurring bill: end_date is before the first due date.", ok=False)
+
+    # Only upcoming instances are scheduled: occurrences before today are
+    # skipped instead of being created as overdue bills.
+    today = date.today()
+    next_due = first_due
+    while next_due < today:
+        next_due = next_occurrence(rule, next_due, first_due)
+
+    try:
+        template_id = db.add_bill_template(
+            name=name,
+            amount=amount,
+            rule=format_rule(rule),
+            start_date=first_due.isoformat(),
+            next_due=next_due.isoformat(),
+            currency=currency,
+            end_date=end_raw,
+            notes=notes,
+            idempotency_key=params.get(IDEMPOTENCY_PARAM),
         )
-    return "\n".join(lines)
+    except db.DuplicateWrite as e:
+        return _duplicate_message("Recurring bill template", e.record_id, PANEL_BILLS)
+    created = scheduler.materialize_upcoming(template_id=template_id)
+    return RecurringBillAdded(
+        template_id, name, amount, currency, format_rule(rule), next_due.isoformat(), created
+    )
 
 
-def _handle_summarize_bills(params: Dict[str, Any]) -> str:
-    include_paid = bool(params.get("include_paid", False))
-    rows = db.list_bills(include_paid=include_paid)
+def _handle_upcoming_bills(params: Dict[str, Any]) -> ActionResult:
+    days = params["days"]
+    today = date.today()
+    end = today + timedelta(days=max(days, 0))
+    rows = db.upcoming_bills(start_date=today.isoformat(), end_date=end.isoformat())
+    return BillList(
+        f"Upcoming bills (next {days} day(s)):",
+        rows,
+        f"No unpaid bills are due in the next {days} day(s).",
+    )
 
-    if not rows:
-        return "There are no bills to summarize."
+
+def _handle_overdue_bills(params: Dict[str, Any]) -> ActionResult:
+    rows = db.overdue_bills(as_of=date.today().isoformat())
+    return BillList("Overdue bills:", rows, "There are no overdue bills.")
+
+
+def _handle_summarize_bills(params: Dict[str, Any]) -> ActionResult:
+    include_paid = params["include_paid"]
+    rows = db.list_bills(include_paid=include_paid)
 
     total = 0.0
     unpaid_count = 0
@@ -150,17 +419,11 @@ def _handle_summarize_bills(params: Dict[str, Any]) -> str:
         if not r["is_paid"]:
             unpaid_count += 1
 
-    lines = [
-        "Bill summary:",
-        f"- Total bills (include_paid={include_paid}): {len(rows)}",
-        f"- Total amount (all bills): {total:.0f} VND",
-        f"- Number of unpaid bills: {unpaid_count}",
-    ]
-    return "\n".join(lines)
+    return BillSummary(include_paid, len(rows), total, unpaid_count)
 
 
-def _handle_generate_report_file(params: Dict[str, Any]) -> str:
-    period = params.get("period", "this_month")
+def _handle_generate_report_file(params: Dict[str, Any]) -> ActionResult:
+    period = params["period"]
     rows = db.get_expenses(period=period, start_date=None, end_date=None)
 
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -181,47 +444,40 @@ def _handle_generate_report_file(params: Dict[str, Any]) -> str:
                     f"{r['category'] or 'N/A'} | "
                     f"{r['description'] or ''}\n"
                 )
-    return f"Created report at: {report_path}"
+    return ReportCreated(str(report_path), period, len(rows))
 
 
-def _handle_delete_expense(params: Dict[str, Any]) -> str:
-    expense_id = int(params.get("expense_id", 0))
-    if expense_id <= 0:
-        return "Cannot delete expense: invalid or missing expense_id."
-
+def _handle_delete_expense(params: Dict[str, Any]) -> ActionResult:
+    expense_id = params["expense_id"]
     deleted = db.delete_expense(expense_id)
     if not deleted:
-        return f"Expense #{expense_id} does not exist. Nothing was deleted."
-    return f"Deleted expense #{expense_id}."
-
+        return Message(f"Expense #{expense_id} does not exist. Nothing was deleted.", ok=False)
+    return Message(f"Deleted expense #{expense_id}.", panel=PANEL_EXPENSES)
 
-def _handle_mark_bill_paid(params: Dict[str, Any]) -> str:
-    bill_id = int(params.get("bill_id", 0))
-    if bill_id <= 0:
-        return "Cannot mark bill as paid: invalid or missing bill_id."
 
+def _handle_mark_bill_paid(params: Dict[str, Any]) -> ActionResult:
+    bill_id = params["bill_id"]
     updated = db.mark_bill_paid(bill_id)
     if not updated:
-        return f"Bill #{bill_id} either does not exist or is already marked as paid."
-    return f"Marked bill #{bill_id} as paid."
-
-
-def _handle_plan_savings_goal(params: Dict[str, Any]) -> str:
-    target = float(params.get("target_amount", 0))
-    current = float(params.get("current_savings", 0))
-    deadline_str = params.get("deadline")
+        return Message(
+            f"Bill #{bill_id} either does not exist or is already marked as paid.", ok=False
+        )
+    return Message(f"Marked bill #{bill_id} as paid.", panel=PANEL_BILLS)
 
-    if not deadline_str:
-        return "Savings goal plan: missing deadline date (YYYY-MM-DD)."
 
-    try:
-        deadline = datetime.strptime(deadline_str, "%Y-%m-%d").date()
-    except ValueError:
-        return "Savings goal plan: invalid deadline format, expected YYYY-MM-DD."
+def _handle_plan_savings_goal(params: Dict[str, Any]) -> ActionResult:
+    target = params["target_amount"]
+    current = params["current_savings"]
+    deadline_str = params["deadline"]
+    deadline = date.fromisoformat(deadline_str)
 
     today = date.today()
     if deadline <= today:
-        return "Savings goal plan: deadline is in the past or today; cannot compute a forward-looking plan."
+        return Message(
+            "Savings goal plan: deadline is in the past or today; cannot compute a forward-looking plan.",
+            ok=False,
+            panel=PANEL_SAVINGS,
+        )
 
     remaining = max(target - current, 0.0)
     days_left = (deadline - today).days
@@ -232,33 +488,20 @@ def _handle_plan_savings_goal(params: Dict[str, Any]) -> str:
     per_week = remaining / weeks_left if weeks_left > 0 else remaining
     per_day = remaining / days_left if days_left > 0 else remaining
 
-    lines = [
-        "Savings goal plan:",
-        f"- Target amount: {target:.0f} VND",
-        f"- Current savings: {current:.0f} VND",
-        f"- Remaining amount: {remaining:.0f} VND",
-        f"- Deadline: {deadline_str} (in {days_left} days)",
-        f"- Suggested saving per month: {per_month:.0f} VND",
-        f"- Suggested saving per week: {per_week:.0f} VND",
-        f"- Suggested saving per day: {per_day:.0f} VND",
-    ]
-
-    if per_month <= 0:
-        lines.append("- You already reached or exceeded the target amount!")
-    elif per_month > target * 0.5:
-        lines.append(
-            "- Warning: required monthly saving is very high compared to the target; "
-            "you may need to extend the deadline or lower the goal."
-        )
-    return "\n".join(lines)
+    return SavingsPlan(
+        target, current, remaining, deadline_str, days_left, per_month, per_week, per_day
+    )
 
 
-def _handle_spending_health_check(params: Dict[str, Any]) -> str:
-    period = params.get("period", "this_month")
-    rows = db.get_expenses(period=period, start_date=None, end_date=None)
+def _handle_spending_health_check(params: Dict[str, Any]) -> ActionResult:
+    period = params["period"]
+    rows = db.expense_totals_by_category(*db.period_range(period))
 
     if not rows:
-        return f"Spending health check: no expenses found for period '{period}'."
+        return Message(
+            f"Spending health check: no expenses found for period '{period}'.",
+            panel=PANEL_HEALTH,
+        )
 
     NEEDS_CATS = {
         "Food", "Groceries", "Rent", "Housing", "Utilities", "Electricity",
@@ -275,10 +518,9 @@ def _handle_spending_health_check(params: Dict[str, Any]) -> str:
     wants = 0.0
 
     for r in rows:
-        amt = float(r["amount"])
+        amt = float(r["total"])
         total += amt
-        cat_raw = (r["category"] or "").strip()
-        cat = cat_raw.title()
+        cat = categorizer.canonical_label(r["category"]).title()
 
         if cat in NEEDS_CATS:
             needs += amt
@@ -286,37 +528,182 @@ def _handle_spending_health_check(params: Dict[str, Any]) -> str:
             wants += amt
 
     other = max(total - needs - wants, 0.0)
-
-    def pct(x: float) -> float:
-        return (x / total * 100.0) if total > 0 else 0.0
-
-    needs_pct = pct(needs)
-    wants_pct = pct(wants)
-    other_pct = pct(other)
-
-    lines = [
-        f"Spending health check (period='{period}')",
-        f"- Total spending: {total:.0f} VND",
-        f"- Needs: {needs:.0f} VND ({needs_pct:.1f}%)",
-        f"- Wants: {wants:.0f} VND ({wants_pct:.1f}%)",
-        f"- Other: {other:.0f} VND ({other_pct:.1f}%)",
-        "",
-        "Guideline (50/30/20 rule):",
-        "- Needs ~ 50% of income, Wants ~ 30%, Savings/Debt repayment ~ 20%.",
-    ]
-
-    if needs_pct > 55:
-        lines.append("- Your Needs spending is above 50%. Consider optimising fixed costs if possible.")
-    elif needs_pct < 40:
-        lines.append("- Your Needs spending is relatively low; this may allow more room for savings.")
-
-    if wants_pct > 35:
-        lines.append("- Your Wants spending is quite high. You may want to reduce optional purchases.")
-    elif wants_pct < 20:
-        lines.append("- Your Wants spending is modest; good job keeping lifestyle expenses under control.")
-
-    lines.append(
-        "- Note: this is a rough check based only on recorded expenses; "
-        "it does not include your savings or income information."
+    return HealthCheck(period, total, needs, wants, other)
+
+
+def _budget_alerts(
+    category: Optional[str], month: str, currency: str, amount: float, spent: float
+) -> List[ActionResult]:
+    # ``spent`` is the counter value returned by the insert's own transaction,
+    # so concurrent inserts each see exactly one crossing of a threshold.
+    if amount <= 0:
+        return []
+    rows = db.get_budget_status(
+        month=month, category=(category or "").strip() or db.UNCATEGORIZED
     )
+    if not rows or rows[0]["currency"] != currency:
+        return []
+
+    budget = rows[0]
+    limit = float(budget["limit_amount"])
+    before = spent - amount
+    for threshold in BUDGET_ALERT_THRESHOLDS:
+        if before < limit * threshold <= spent:
+            return [BudgetAlert(budget["category"], month, threshold, spent, limit, currency)]
+    return []
+
+
+def _handle_set_budget(params: Dict[str, Any]) -> ActionResult:
+    category = params["category"]
+    if AUTO_CATEGORIZE:
+        # Budgets use the same labels as auto-categorized expenses.
+        category = categorizer.canonical_label(category)
+    amount = params["amount"]
+    currency = params["currency"]
+    month = params["month"]
+
+    db.set_budget(category=category, limit_amount=amount, month=month, currency=currency)
+    scope = f"for {month}" if month else "for every month"
+    return Message(f"Set budget for '{category}' {scope}: {amount:.0f} {currency}.", panel=PANEL_BUDGET)
+
+
+def _handle_budget_status(params: Dict[str, Any]) -> ActionResult:
+    month = params["month"] or date.today().strftime("%Y-%m")
+    return BudgetStatus(month, db.get_budget_status(month=month))
+
+
+ACTIONS: Dict[str, ActionSpec] = {
+    "add_expense": ActionSpec(
+        _handle_add_expense,
+        "Insert a new expense.",
+        (
+            Param("amount", "number", required=True, positive=True),
+            Param("currency", "string", "VND"),
+            Param("category", "string", doc='e.g. "Food", "Transport", "Entertainment"'),
+            Param("description", "string"),
+            Param("date", "date", doc="always output a date, use today if unspecified"),
+        ),
+    ),
+    "list_expenses": ActionSpec(
+        _handle_list_expenses,
+        "List recent expenses.",
+        (Param("limit", "integer", 10, positive=True),),
+    ),
+    "summarize_expenses": ActionSpec(
+        _handle_summarize_expenses,
+        "Summarize expenses for a period.",
+        (Param("period", "string", "this_month", choices=PERIODS),),
+    ),
+    "add_bill": ActionSpec(
+        _handle_add_bill,
+        "Insert a bill to pay in the future.",
+        (
+            Param("name", "string", required=True),
+            Param("amount", "number", required=True, positive=True),
+            Param("currency", "string", "VND"),
+            Param("due_date", "date", required=True),
+            Param("notes", "string"),
+        ),
+    ),
+    "list_bills": ActionSpec(
+        _handle_list_bills,
+        "List bills (only unpaid ones unless include_paid).",
+        (Param("include_paid", "boolean", False),),
+    ),
+    "summarize_bills": ActionSpec(
+        _handle_summarize_bills, "Summarize bills.", (Param("include_paid", "boolean", False),)
+    ),
+    "generate_report_file": ActionSpec(
+        _handle_generate_report_file,
+        "Write a Markdown expense report file.",
+        (Param("period", "string", "this_month", choices=PERIODS),),
+    ),
+    "delete_expense": ActionSpec(
+        _handle_delete_expense,
+        "Delete an expense by ID.",
+        (Param("expense_id", "integer", required=True, positive=True),),
+    ),
+    "mark_bill_paid": ActionSpec(
+        _handle_mark_bill_paid,
+        "Mark a bill as paid.",
+        (Param("bill_id", "integer", required=True, positive=True),),
+    ),
+    "plan_savings_goal": ActionSpec(
+        _handle_plan_savings_goal,
+        "Compute how much to save per month/week/day to reach a goal.",
+        (
+            Param("target_amount", "number", required=True, positive=True),
+            Param("current_savings", "number", 0),
+            Param("deadline", "date", required=True),
+        ),
+    ),
+    "spending_health_check": ActionSpec(
+        _handle_spending_health_check,
+        "Compare spending for a period with the 50/30/20 rule.",
+        (Param("period", "string", "this_month", choices=PERIODS),),
+    ),
+    "set_budget": ActionSpec(
+        _handle_set_budget,
+        "Set a monthly spending limit for a category.",
+        (
+            Param("category", "string", required=True),
+            Param("amount", "number", required=True, positive=True),
+            Param("currency", "string", "VND"),
+            Param("month", "month", doc="omit to apply to every month"),
+        ),
+    ),
+    "budget_status": ActionSpec(
+        _handle_budget_status,
+        "Show spending against each category budget.",
+        (Param("month", "month", doc="default: current month"),),
+    ),
+    "add_recurring_bill": ActionSpec(
+        _handle_add_recurring_bill,
+        "Create a recurring bill (rent, subscriptions); upcoming instances are scheduled.",
+        (
+            Param("name", "string", required=True),
+            Param("amount", "number", required=True, positive=True),
+            Param("currency", "string", "VND"),
+            Param(
+                "frequency",
+                "string",
+                "monthly",
+                doc='daily|weekly|monthly|yearly or e.g. "FREQ=MONTHLY;INTERVAL=2;BYMONTHDAY=15", '
+                '"FREQ=WEEKLY;BYDAY=FR"',
+            ),
+            Param("start_date", "date", doc="first due date, default today; past occurrences are skipped"),
+            Param("end_date", "date"),
+            Param("notes", "string"),
+        ),
+    ),
+    "upcoming_bills": ActionSpec(
+        _handle_upcoming_bills,
+        "List unpaid bills due within the next N days.",
+        (Param("days", "integer", 7),),
+    ),
+    "overdue_bills": ActionSpec(_handle_overdue_bills, "List unpaid bills past their due date."),
+}
+
+VALIDATORS: Dict[str, Validator] = {
+    name: _compile_validator(spec.params) for name, spec in ACTIONS.items()
+}
+
+
+def describe_actions() -> str:
+    # One compact signature line per action, used by the planner prompt.
+    type_names = {"date": "YYYY-MM-DD", "month": "YYYY-MM"}
+    lines = []
+    for name, spec in ACTIONS.items():
+        params = []
+        for p in spec.params:
+            type_name = "|".join(p.choices) if p.choices else type_names.get(p.type, p.type)
+            optional = not p.required and p.default is None
+            text = f"{p.name}{'?' if optional else ''}: {type_name}"
+            if p.default is not None:
+                text += f" = {json.dumps(p.default)}"
+            if p.doc:
+                text += f" ({p.doc})"
+            params.append(text)
+        flag = " [destructive]" if name in DESTRUCTIVE_ACTIONS else ""
+        lines.append(f"- {name}({', '.join(params)}){flag}: {spec.summary}")
     return "\n".join(lines)
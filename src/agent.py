@@ -1,28 +1,96 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
+from . import db
 from .llm_client import get_actions_from_llm
-from .actions import execute_actions
+from .actions import execute_actions, normalize_actions
+from .config import PLANNER_BATCH_MAX, PLANNER_BATCH_WINDOW_MS
+from .planner_batch import MicroBatchPlanner
+from .results import Message
 from .safety import (
+    CONFIRM_ALLOW,
+    CONFIRM_DENY,
+    CONFIRM_PROMPT,
+    CONFIRMATION_POLICIES,
     actions_require_confirmation,
     log_actions,
     validate_actions,
 )
 
 
-def handle_user_input(user_text: str, *, ask_confirmation: bool = True) -> Dict[str, Any]:
-    plan, actions = get_actions_from_llm(user_text)
+_batch_planner: Optional[MicroBatchPlanner] = None
 
+
+def enable_plan_batching(window_ms: int, max_batch: int = PLANNER_BATCH_MAX) -> None:
+    # Route plan_user_input through a shared micro-batching planner;
+    # a window of 0 goes back to one LLM call per request.
+    global _batch_planner
+    _batch_planner = MicroBatchPlanner(window_ms, max_batch) if window_ms > 0 else None
+
+
+if PLANNER_BATCH_WINDOW_MS > 0:
+    enable_plan_batching(PLANNER_BATCH_WINDOW_MS)
+
+
+def plan_user_input(user_text: str) -> Tuple[str, List[Dict[str, Any]]]:
+    if _batch_planner is not None:
+        plan, actions = _batch_planner.plan(user_text)
+    else:
+        plan, actions = get_actions_from_llm(user_text)
     validate_actions(actions)
+    # Bad params reject the whole plan here, before confirmation or any db work.
+    return plan, normalize_actions(actions)
+
 
-    if ask_confirmation and actions_require_confirmation(actions):
+def execute_plan(
+    user_text: str,
+    plan: str,
+    actions: List[Dict[str, Any]],
+    *,
+    confirm_policy: str = CONFIRM_PROMPT,
+    request_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    # ``request_id`` makes the plan's inserts idempotent: executing it again
+    # for the same request (a retry, a double submit) writes nothing twice.
+    if confirm_policy not in CONFIRMATION_POLICIES:
+        raise ValueError(f"Unknown confirmation policy: {confirm_policy}")
+
+    if confirm_policy != CONFIRM_ALLOW and actions_require_confirmation(actions):
+        if confirm_policy == CONFIRM_DENY:
+            return {
+                "plan": plan + " (CANCELLED because destructive actions are not allowed).",
+                "results": [
+                    Message("Execution cancelled: the plan contains destructive actions.", ok=False)
+                ],
+                "cancelled": True,
+            }
         print("[WARNING] There are potentially destructive actions in this plan.")
         ans = input("Are you sure you want to continue? (yes/no): ").strip().lower()
         if ans not in ("y", "yes"):
             return {
                 "plan": plan + " (CANCELLED because the user did not confirm).",
-                "results": ["Execution cancelled by user."],
+                "results": [Message("Execution cancelled by user.", ok=False)],
+                "cancelled": True,
             }
 
-    log_actions(user_text, actions)
-    results = execute_actions(actions)
+    log_actions(user_text, actions, tenant=db.current_tenant(), request_id=request_id)
+    results = execute_actions(actions, request_id=request_id)
     return {"plan": plan, "results": results}
+
+
+def handle_user_input(
+    user_text: str,
+    *,
+    ask_confirmation: bool = True,
+    confirm_policy: Optional[str] = None,
+    tenant: Optional[str] = None,
+    request_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    # ``tenant`` selects whose database the plan runs against; None keeps
+    # the caller's current tenant.
+    if confirm_policy is None:
+        confirm_policy = CONFIRM_PROMPT if ask_confirmation else CONFIRM_ALLOW
+    with db.use_tenant(tenant or db.current_tenant()):
+        plan, actions = plan_user_input(user_text)
+        return execute_plan(
+            user_text, plan, actions, confirm_policy=confirm_policy, request_id=request_id
+        )
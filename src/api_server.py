@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import db
+from .actions import execute_actions, normalize_actions
+from .agent import handle_user_input
+from .config import API_HOST, API_PORT, API_WORKERS, LOG_DIR, REPORTS_DIR
+from .results import results_to_json
+from .safety import CONFIRM_ALLOW, CONFIRM_DENY, log_actions, validate_actions
+
+MAX_BODY_BYTES = 1024 * 1024
+TENANT_HEADER = "x-tenant-id"
+IDEMPOTENCY_HEADER = "idempotency-key"
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _rows_to_dicts(rows) -> list:
+    return [dict(r) for r in rows]
+
+
+def _request_id(body: Dict[str, Any]) -> Optional[str]:
+    # Clients that retry send the same request_id (or Idempotency-Key
+    # header) so the retried inserts are not written twice.
+    request_id = body.get("request_id")
+    if request_id is None:
+        return None
+    if not isinstance(request_id, str) or not 0 < len(request_id) <= 200:
+        raise HttpError(400, "Field 'request_id' must be a string of 1-200 characters.")
+    return request_id
+
+
+def _run_user_input(body: Dict[str, Any]) -> Dict[str, Any]:
+    text = (body.get("text") or "").strip()
+    if not text:
+        raise HttpError(400, "Field 'text' is required.")
+    # There is no interactive prompt over HTTP: plans with destructive actions
+    # are refused unless the caller explicitly sends "confirm": true.
+    policy = CONFIRM_ALLOW if body.get("confirm") is True else CONFIRM_DENY
+    result = handle_user_input(
+        user_text=text, confirm_policy=policy, request_id=_request_id(body)
+    )
+    result["results"] = results_to_json(result["results"])
+    return result
+
+
+def _run_actions(body: Dict[str, Any]) -> Dict[str, Any]:
+    actions = body.get("actions")
+    if not isinstance(actions, list):
+        raise HttpError(400, "Field 'actions' must be a list.")
+    try:
+        validate_actions(actions)
+        actions = normalize_actions(actions)
+    except ValueError as e:
+        raise HttpError(400, str(e)) from e
+    request_id = _request_id(body)
+    log_actions(
+        "[api] direct actions", actions, tenant=db.current_tenant(), request_id=request_id
+    )
+    return {"results": results_to_json(execute_actions(actions, request_id=request_id))}
+
+
+def _list_expenses(query: Dict[str, list]) -> Dict[str, Any]:
+    limit = int(query.get("limit", ["20"])[0])
+    return {"expenses": _rows_to_dicts(db.list_expenses(limit=limit))}
+
+
+def _list_bills(query: Dict[str, list]) -> Dict[str, Any]:
+    include_paid = query.get("include_paid", ["false"])[0].lower() in ("1", "true", "yes")
+    return {"bills": _rows_to_dicts(db.list_bills(include_paid=include_paid))}
+
+
+def _list_changes(query: Dict[str, list]) -> Dict[str, Any]:
+    # Change feed: clients pass the last seq they saw. ``oldest`` above
+    # since + 1 means entries were pruned and the client has to reload.
+    try:
+        since = int(query.get("since", ["0"])[0])
+        limit = min(int(query.get("limit", ["1000"])[0]), 10000)
+    except ValueError as e:
+        raise HttpError(400, "Parameters 'since' and 'limit' must be integers.") from e
+    oldest, latest = db.change_log_bounds()
+    changes = [
+        {
+            **dict(r),
+            "old": json.loads(r["old"]) if r["old"] else None,
+            "new": json.loads(r["new"]) if r["new"] else None,
+        }
+        for r in db.changes_since(since, limit=limit)
+    ]
+    return {"changes": changes, "oldest": oldest, "latest": latest}
+
+
+GET_ROUTES: Dict[str, Callable[[Dict[str, list]], Dict[str, Any]]] = {
+    "/health": lambda query: {"status": "ok"},
+    "/v1/expenses": _list_expenses,
+    "/v1/bills": _list_bills,
+    "/v1/changes": _list_changes,
+}
+
+POST_ROUTES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "/v1/requests": _run_user_input,
+    "/v1/actions": _run_actions,
+}
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line.")
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", "0") or 0)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _encode_response(status: int, payload: Dict[str, Any], keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _call_for_tenant(tenant: Optional[str], handler: Callable, arg: Any) -> Dict[str, Any]:
+    # Runs on a worker thread: the tenant context has to be set there.
+    with db.use_tenant(tenant):
+        return handler(arg)
+
+
+async def _dispatch(
+    executor: ThreadPoolExecutor,
+    method: str,
+    target: str,
+    headers: Dict[str, str],
+    body: bytes,
+) -> Dict[str, Any]:
+    url = urlsplit(target)
+    loop = asyncio.get_running_loop()
+    tenant = headers.get(TENANT_HEADER) or None
+
+    if method == "GET":
+        handler = GET_ROUTES.get(url.path)
+        if handler is None:
+            raise HttpError(404 if url.path not in POST_ROUTES else 405, "Not found.")
+        return await loop.run_in_executor(
+            executor, _call_for_tenant, tenant, handler, parse_qs(url.query)
+        )
+
+    if method == "POST":
+        handler = POST_ROUTES.get(url.path)
+        if handler is None:
+            raise HttpError(404 if url.path not in GET_ROUTES else 405, "Not found.")
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"Invalid JSON body: {e}") from e
+        if not isinstance(payload, dict):
+            raise HttpError(400, "JSON body must be an object.")
+        if IDEMPOTENCY_HEADER in headers:
+            payload.setdefault("request_id", headers[IDEMPOTENCY_HEADER])
+        return await loop.run_in_executor(executor, _call_for_tenant, tenant, handler, payload)
+
+    raise HttpError(405, f"Method not allowed: {method}")
+
+
+async def _handle_connection(
+    executor: ThreadPoolExecutor,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = 200, await _dispatch(executor, method, target, headers, body)
+            except HttpError as e:
+                status, payload = e.status, {"error": e.message}
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except ValueError as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:
+                status, payload = 500, {"error": str(e)}
+
+            writer.write(_encode_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(
+    host: str = API_HOST,
+    port: int = API_PORT,
+    workers: int = API_WORKERS,
+    ready: Optional[threading.Event] = None,
+) -> None:
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    db.init_db()
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+    server = await asyncio.start_server(partial(_handle_connection, executor), host, port)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for the expense agent.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    args = parser.parse_args()
+
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker thread(s).")
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
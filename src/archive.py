@@ -0,0 +1,54 @@
+import argparse
+import time
+from datetime import date
+
+from . import db
+
+
+def archive_closed_years(before: int) -> int:
+    # Archives every year before ``before`` that still has hot rows.
+    moved = 0
+    for year in db.hot_expense_years(before):
+        moved += db.archive_year(year)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move closed years of expenses into per-year archive files."
+    )
+    parser.add_argument("--year", type=int, help="archive a single closed year")
+    parser.add_argument(
+        "--before",
+        type=int,
+        default=date.today().year,
+        help="archive every year before this one (default: the current year)",
+    )
+    parser.add_argument("--tenant", default=None, help="tenant database (default: the default one)")
+    parser.add_argument("--list", action="store_true", help="list archived years and exit")
+    args = parser.parse_args()
+
+    if args.year is not None and args.year >= date.today().year:
+        parser.error("--year must be a closed (past) year.")
+
+    with db.use_tenant(args.tenant):
+        db.init_db()
+        if args.list:
+            years = db.archived_years()
+            if not years:
+                print("No archived years.")
+            for year in years:
+                print(f"{year}: {db.archive_path(year)}")
+            return
+
+        started = time.perf_counter()
+        if args.year is not None:
+            moved = db.archive_year(args.year)
+        else:
+            moved = archive_closed_years(min(args.before, date.today().year))
+        elapsed = time.perf_counter() - started
+        print(f"Archived {moved} expense(s) in {elapsed:.3f}s.")
+
+
+if __name__ == "__main__":
+    main()
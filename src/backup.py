@@ -0,0 +1,188 @@
+import argparse
+import gzip
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from . import db
+from .config import BACKUP_DIR, BACKUP_INTERVAL_SECONDS, BACKUP_KEEP, BACKUP_PAGES_PER_STEP
+
+# Pauses between backup steps / compression chunks so writers get the disk
+# (and the GIL) in between.
+STEP_SLEEP_SECONDS = 0.005
+COMPRESS_CHUNK_BYTES = 256 * 1024
+COMPRESS_PAUSE_SECONDS = 0.001
+
+Progress = Callable[[int, int, int], None]
+
+
+def backup_file(
+    source: Path,
+    dest: Path,
+    *,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    progress: Optional[Progress] = None,
+) -> Path:
+    # Copies a live database with the online backup API, ``pages`` pages per
+    # step. The source connection holds one read transaction for the whole
+    # copy: in WAL mode that pins a snapshot, so writers keep committing and
+    # their commits never force the backup to restart.
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    partial = dest.with_name(dest.name + ".partial")
+    partial.unlink(missing_ok=True)
+
+    src = sqlite3.connect(str(source))
+    dst = sqlite3.connect(str(partial))
+    # The partial file is thrown away on failure, so it needs no journal or
+    # fsyncs of its own; that keeps its writes from competing with the
+    # database's commits.
+    dst.execute("PRAGMA journal_mode=OFF")
+    dst.execute("PRAGMA synchronous=OFF")
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=pages, progress=progress, sleep=STEP_SLEEP_SECONDS)
+        src.rollback()
+    finally:
+        dst.close()
+        src.close()
+    partial.replace(dest)
+    return dest
+
+
+def compress_file(path: Path) -> Path:
+    target = path.with_name(path.name + ".gz")
+    with path.open("rb") as f_in, gzip.open(target, "wb", compresslevel=6) as f_out:
+        while True:
+            chunk = f_in.read(COMPRESS_CHUNK_BYTES)
+            if not chunk:
+                break
+            f_out.write(chunk)
+            time.sleep(COMPRESS_PAUSE_SECONDS)
+    path.unlink()
+    return target
+
+
+def _prune(directory: Path, stem: str, keep: int) -> None:
+    # Snapshot names sort by time, newest last.
+    snapshots = sorted(directory.glob(f"{stem}-*"))
+    for old in snapshots[: max(len(snapshots) - keep, 0)]:
+        old.unlink()
+
+
+def create_snapshot(
+    tenant: Optional[str] = None,
+    *,
+    compress: bool = True,
+    keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    progress: Optional[Callable[[str], Progress]] = None,
+) -> List[Path]:
+    # Snapshots a tenant's database and its yearly archive files into
+    # BACKUP_DIR/<tenant>/. ``progress`` gets a label and returns the
+    # per-file callback.
+    tenant = tenant or db.DEFAULT_TENANT
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    target_dir = BACKUP_DIR / tenant
+
+    with db.use_tenant(tenant):
+        sources = [Path(db.db_path_for(tenant))]
+        sources.extend(db.archive_path(year) for year in db.archived_years())
+
+    written = []
+    for source in sources:
+        if not source.exists():
+            continue
+        dest = target_dir / f"{source.stem}-{stamp}.db"
+        callback = progress(source.name) if progress else None
+        path = backup_file(source, dest, pages=pages, progress=callback)
+        if compress:
+            path = compress_file(path)
+        written.append(path)
+        _prune(target_dir, source.stem, keep)
+    return written
+
+
+def print_progress(label: str) -> Progress:
+    last = [-1]
+
+    def report(status: int, remaining: int, total: int) -> None:
+        percent = 100 if not total else int((total - remaining) * 100 / total)
+        if percent != last[0]:
+            last[0] = percent
+            print(f"\r[backup] {label}: {percent}% of {total} pages", end="", file=sys.stderr)
+            if remaining == 0:
+                print(file=sys.stderr)
+
+    return report
+
+
+def run_loop(
+    interval_seconds: int = BACKUP_INTERVAL_SECONDS,
+    stop_event: Optional[threading.Event] = None,
+) -> None:
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        for tenant in db.list_tenants():
+            try:
+                paths = create_snapshot(tenant)
+                print(f"[backup] {tenant}: wrote {', '.join(p.name for p in paths)}")
+            except Exception as e:
+                print(f"[backup] Error for {tenant}: {e}")
+        stop_event.wait(interval_seconds)
+
+
+def start_background(interval_seconds: int = BACKUP_INTERVAL_SECONDS) -> threading.Event:
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_loop, args=(interval_seconds, stop_event), name="db-backup", daemon=True
+    )
+    thread.start()
+    return stop_event
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Back up the database online (without blocking writers)."
+    )
+    parser.add_argument("--tenant", default=None, help="tenant to back up (default: the default one)")
+    parser.add_argument("--all-tenants", action="store_true", help="back up every tenant")
+    parser.add_argument("--no-compress", action="store_true", help="keep plain .db snapshots")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="snapshots kept per file")
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES_PER_STEP, help="pages per step")
+    parser.add_argument(
+        "--loop", action="store_true", help="keep running, one backup every --interval seconds"
+    )
+    parser.add_argument("--interval", type=int, default=BACKUP_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    if args.loop:
+        print(f"Backing up every {args.interval}s into {BACKUP_DIR} (Ctrl+C to stop).")
+        try:
+            run_loop(interval_seconds=args.interval)
+        except KeyboardInterrupt:
+            print("Backups stopped.")
+        return
+
+    tenants = db.list_tenants() if args.all_tenants else [args.tenant]
+    for tenant in tenants:
+        started = time.perf_counter()
+        paths = create_snapshot(
+            tenant,
+            compress=not args.no_compress,
+            keep=args.keep,
+            pages=args.pages,
+            progress=print_progress,
+        )
+        elapsed = time.perf_counter() - started
+        for path in paths:
+            print(f"{path} ({path.stat().st_size / 1024 / 1024:.1f} MiB)")
+        print(f"Backed up {tenant or db.DEFAULT_TENANT} in {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from . import db
+from .agent import execute_plan, plan_user_input
+from .config import LOG_DIR, REPORTS_DIR
+from .results import results_to_json
+from .safety import CONFIRM_DENY, CONFIRM_PROMPT, CONFIRMATION_POLICIES
+
+DEFAULT_WORKERS = 4
+
+
+def read_requests(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    # One request per line: plain text, or a JSON object
+    # {"id": ..., "text": ..., "tenant": ..., "request_id": ...} (tenant and
+    # request_id are optional; re-running lines with a request_id is safe).
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": line_no, "text": "", "error": f"Invalid JSON line: {e}"}
+                continue
+            yield {
+                "id": obj.get("id", line_no),
+                "text": str(obj.get("text") or ""),
+                "tenant": obj.get("tenant"),
+                "request_id": obj.get("request_id"),
+            }
+        else:
+            yield {"id": line_no, "text": line}
+
+
+def _plan(request: Dict[str, Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if request.get("error"):
+        return {"error": request["error"], "plan_ms": 0.0}
+    if not request["text"]:
+        return {"error": "Empty request text.", "plan_ms": 0.0}
+    try:
+        plan, actions = plan_user_input(request["text"])
+        return {
+            "plan": plan,
+            "actions": actions,
+            "plan_ms": (time.perf_counter() - started) * 1000.0,
+        }
+    except Exception as e:
+        return {"error": str(e), "plan_ms": (time.perf_counter() - started) * 1000.0}
+
+
+def _execute(
+    request: Dict[str, Any], planned: Dict[str, Any], confirm_policy: str, tenant: Optional[str]
+) -> Dict[str, Any]:
+    record: Dict[str, Any] = {
+        "id": request["id"],
+        "text": request["text"],
+        "plan_ms": round(planned["plan_ms"], 1),
+    }
+    if "error" in planned:
+        record.update(status="error", error=planned["error"])
+        return record
+
+    started = time.perf_counter()
+    try:
+        with db.use_tenant(request.get("tenant") or tenant):
+            result = execute_plan(
+                request["text"],
+                planned["plan"],
+                planned["actions"],
+                confirm_policy=confirm_policy,
+                request_id=request.get("request_id"),
+            )
+        record.update(
+            status="cancelled" if result.get("cancelled") else "ok",
+            plan=result["plan"],
+            actions=planned["actions"],
+            results=results_to_json(result["results"]),
+        )
+    except Exception as e:
+        record.update(status="error", error=str(e), plan=planned["plan"])
+    record["execute_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+    return record
+
+
+def run_batch(
+    source: TextIO,
+    sink: TextIO,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    confirm_policy: str = CONFIRM_DENY,
+    tenant: Optional[str] = None,
+) -> Dict[str, int]:
+    # Planning (LLM calls) runs concurrently on a bounded pool; execution
+    # stays serial and in input order so writes apply deterministically.
+    counts = {"total": 0, "ok": 0, "error": 0, "cancelled": 0}
+    window: "deque[tuple[Dict[str, Any], Future]]" = deque()
+    max_in_flight = max(workers, 1) * 2
+
+    def drain_one() -> None:
+        request, future = window.popleft()
+        record = _execute(request, future.result(), confirm_policy, tenant)
+        sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+        sink.flush()
+        counts["total"] += 1
+        counts[record["status"]] += 1
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="planner") as pool:
+        for request in read_requests(source):
+            window.append((request, pool.submit(_plan, request)))
+            if len(window) >= max_in_flight:
+                drain_one()
+        while window:
+            drain_one()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Process many agent requests from a file (plain lines or JSON Lines)."
+    )
+    parser.add_argument("input", help="requests file, or '-' for stdin")
+    parser.add_argument(
+        "-o", "--output", default="-", help="JSON Lines results file (default: stdout)"
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--confirm",
+        choices=CONFIRMATION_POLICIES,
+        default=CONFIRM_DENY,
+        help="how to treat plans with destructive actions (default: deny)",
+    )
+    parser.add_argument(
+        "--tenant", default=None, help="tenant for requests without their own 'tenant' field"
+    )
+    args = parser.parse_args()
+
+    # The interactive prompt needs the terminal: stdin must not carry the
+    # requests and stdout must not carry the JSON Lines results.
+    if args.confirm == CONFIRM_PROMPT and "-" in (args.input, args.output):
+        parser.error("--confirm prompt requires both an input file and an --output file.")
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    db.init_db()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        counts = run_batch(
+            source, sink, workers=args.workers, confirm_policy=args.confirm, tenant=args.tenant
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"[batch] {counts['total']} request(s) in {elapsed:.2f}s: "
+        f"{counts['ok']} ok, {counts['cancelled']} cancelled, {counts['error']} error(s).",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
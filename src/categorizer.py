@@ -0,0 +1,287 @@
+import argparse
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import db
+from .config import CATEGORIZER_MIN_CONFIDENCE, CATEGORIZER_TRAIN_LIMIT
+
+# Canonical categories are the ones the spending health check buckets.
+# Keys are lowercase words or two-word phrases found in descriptions or
+# typed as category labels.
+KEYWORDS: Dict[str, str] = {
+    # Food & groceries
+    "food": "Food", "meal": "Food", "meals": "Food", "lunch": "Food", "dinner": "Food",
+    "breakfast": "Food", "snack": "Food", "pho": "Food", "phở": "Food", "bún": "Food",
+    "cơm": "Food", "bánh mì": "Food", "ăn trưa": "Food", "ăn tối": "Food",
+    "ăn sáng": "Food",
+    "groceries": "Groceries", "grocery": "Groceries", "supermarket": "Groceries",
+    "market": "Groceries", "chợ": "Groceries", "siêu thị": "Groceries",
+    "winmart": "Groceries", "vinmart": "Groceries", "bách hóa xanh": "Groceries",
+    # Eating out & coffee
+    "restaurant": "Dining Out", "dining": "Dining Out", "dining out": "Dining Out",
+    "eating out": "Dining Out", "nhà hàng": "Dining Out", "buffet": "Dining Out",
+    "coffee": "Coffee", "cafe": "Coffee", "café": "Coffee", "cà phê": "Coffee",
+    "coffee shop": "Coffee", "starbucks": "Coffee", "highlands": "Coffee",
+    "phúc long": "Coffee", "trà sữa": "Coffee", "bubble tea": "Coffee",
+    # Housing & utilities
+    "rent": "Rent", "housing": "Rent", "tiền nhà": "Rent", "thuê nhà": "Rent",
+    "utilities": "Utilities", "utility": "Utilities", "electricity": "Utilities",
+    "electric": "Utilities", "water": "Utilities", "internet": "Utilities", "wifi": "Utilities",
+    "tiền điện": "Utilities", "tiền nước": "Utilities", "evn": "Utilities",
+    # Transport
+    "transport": "Transport", "transportation": "Transport", "taxi": "Transport",
+    "grab": "Transport", "gojek": "Transport", "bus": "Transport", "fuel": "Transport",
+    "petrol": "Transport", "parking": "Transport",
+    "xăng": "Transport", "gửi xe": "Transport", "metro": "Transport",
+    # Health
+    "healthcare": "Healthcare", "health": "Healthcare", "medical": "Healthcare",
+    "medicine": "Healthcare", "pharmacy": "Healthcare", "doctor": "Healthcare",
+    "hospital": "Healthcare", "thuốc": "Healthcare", "bệnh viện": "Healthcare",
+    "insurance": "Insurance", "bảo hiểm": "Insurance",
+    # Wants
+    "entertainment": "Entertainment", "movie": "Entertainment", "movies": "Entertainment",
+    "cinema": "Entertainment", "cgv": "Entertainment", "netflix": "Entertainment",
+    "spotify": "Entertainment", "games": "Entertainment", "game": "Entertainment",
+    "concert": "Entertainment", "karaoke": "Entertainment",
+    "shopping": "Shopping", "clothes": "Shopping", "clothing": "Shopping",
+    "shopee": "Shopping", "lazada": "Shopping", "tiki": "Shopping", "shoes": "Shopping",
+    "travel": "Travel", "hotel": "Travel", "flight": "Travel", "airbnb": "Travel",
+    "vietjet": "Travel", "du lịch": "Travel",
+}
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def merchant_key(description: Optional[str]) -> str:
+    # "Starbucks #123 (Q1)" and "starbucks q1" share a key: lowercase
+    # words only, digits and punctuation dropped.
+    return " ".join(tokenize(description or ""))
+
+
+def canonical_label(category: Optional[str]) -> str:
+    # Maps label variants ("cafe", "Café", "coffee") to one canonical
+    # category; unknown labels are kept as typed.
+    label = (category or "").strip()
+    return KEYWORDS.get(label.lower(), label)
+
+
+def keyword_category(tokens: List[str]) -> Optional[str]:
+    # Two-word phrases win over single words ("dining out" before "out").
+    for first, second in zip(tokens, tokens[1:]):
+        category = KEYWORDS.get(f"{first} {second}")
+        if category:
+            return category
+    for token in tokens:
+        category = KEYWORDS.get(token)
+        if category:
+            return category
+    return None
+
+
+class Categorizer:
+    # Learned merchant lookups, then the keyword dictionary, then a
+    # multinomial naive Bayes model over description words. Everything is
+    # local and in memory.
+
+    def __init__(
+        self, min_confidence: float = CATEGORIZER_MIN_CONFIDENCE, cache_size: int = 65536
+    ):
+        self.min_confidence = min_confidence
+        self._merchants: Dict[str, str] = {}
+        self._classes: List[str] = []
+        self._log_priors: List[float] = []
+        self._log_likelihoods: Dict[str, List[float]] = {}
+        self._unseen: List[float] = []
+        self._lookup = lru_cache(maxsize=cache_size)(self._classify)
+
+    def train(self, samples: Iterable[Tuple[Optional[str], Optional[str]]]) -> int:
+        # Fits the model on (description, category) pairs and records the
+        # majority category of every merchant. Returns the samples used.
+        class_docs: Counter = Counter()
+        word_counts: Dict[str, Counter] = defaultdict(Counter)
+        merchant_votes: Dict[str, Counter] = defaultdict(Counter)
+        used = 0
+        for description, category in samples:
+            label = canonical_label(category)
+            tokens = tokenize(description or "")
+            if not label or not tokens:
+                continue
+            used += 1
+            class_docs[label] += 1
+            word_counts[label].update(tokens)
+            merchant_votes[" ".join(tokens)][label] += 1
+
+        self._classes = sorted(class_docs)
+        vocabulary = set().union(*word_counts.values()) if word_counts else set()
+        vocab_size = len(vocabulary) or 1
+        totals = [sum(word_counts[c].values()) for c in self._classes]
+        self._log_priors = [math.log(class_docs[c] / used) for c in self._classes]
+        # Laplace smoothing; words never seen in training still count.
+        self._unseen = [math.log(1.0 / (total + vocab_size)) for total in totals]
+        self._log_likelihoods = {
+            word: [
+                math.log((word_counts[c][word] + 1) / (total + vocab_size))
+                for c, total in zip(self._classes, totals)
+            ]
+            for word in vocabulary
+        }
+        self._merchants = {
+            merchant: votes.most_common(1)[0][0] for merchant, votes in merchant_votes.items()
+        }
+        self._lookup.cache_clear()
+        return used
+
+    def learn(self, description: Optional[str], category: Optional[str]) -> None:
+        # A user-given category becomes the answer for that merchant.
+        key = merchant_key(description)
+        label = canonical_label(category)
+        if key and label:
+            self._merchants[key] = label
+
+    def categorize(self, description: Optional[str]) -> Optional[str]:
+        key = merchant_key(description)
+        if not key:
+            return None
+        return self._merchants.get(key) or self._lookup(key)
+
+    def _classify(self, key: str) -> Optional[str]:
+        tokens = key.split()
+        category = keyword_category(tokens)
+        if category or not self._classes:
+            return category
+
+        scores = list(self._log_priors)
+        known = False
+        for token in tokens:
+            likelihoods = self._log_likelihoods.get(token)
+            if likelihoods is None:
+                likelihoods = self._unseen
+            else:
+                known = True
+            for i, value in enumerate(likelihoods):
+                scores[i] += value
+        if not known:
+            return None
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        confidence = 1.0 / sum(math.exp(score - top) for score in scores)
+        return self._classes[best] if confidence >= self.min_confidence else None
+
+
+_models: Dict[str, Categorizer] = {}
+_models_lock = threading.Lock()
+
+
+def for_tenant(tenant: Optional[str] = None) -> Categorizer:
+    # One model per tenant, trained from its labeled expenses on first use.
+    tenant = tenant or db.current_tenant()
+    model = _models.get(tenant)
+    if model is None:
+        with _models_lock:
+            model = _models.get(tenant)
+            if model is None:
+                model = Categorizer()
+                with db.use_tenant(tenant):
+                    model.train(
+                        (r["description"], r["category"])
+                        for r in db.labeled_expenses(CATEGORIZER_TRAIN_LIMIT)
+                    )
+                _models[tenant] = model
+    return model
+
+
+def reset(tenant: Optional[str] = None) -> None:
+    # Drops a tenant's model (all models without a tenant) so the next use retrains.
+    with _models_lock:
+        if tenant is None:
+            _models.clear()
+        else:
+            _models.pop(tenant, None)
+
+
+def backfill(batch_size: int = 5000, dry_run: bool = False) -> Tuple[int, int]:
+    # Categorizes every uncategorized expense of the current tenant in
+    # batches. Returns (rows scanned, rows assigned).
+    reset(db.current_tenant())
+    model = for_tenant()
+    scanned = assigned = 0
+    after_id = 0
+    while True:
+        rows = db.uncategorized_expenses(after_id=after_id, limit=batch_size)
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+        scanned += len(rows)
+        assignments = []
+        for r in rows:
+            category = model.categorize(r["description"])
+            if category:
+                assignments.append((r["id"], category))
+        if dry_run:
+            assigned += len(assignments)
+        else:
+            assigned += db.assign_expense_categories(assignments)
+    return scanned, assigned
+
+
+def benchmark(rows: int) -> Dict[str, float]:
+    # Classification speed (rows/s) over the tenant's own descriptions,
+    # with a cold and a warm merchant cache.
+    model = for_tenant()
+    samples = [r["description"] for r in db.labeled_expenses(rows)] or ["lunch"]
+    descriptions = (samples * (rows // len(samples) + 1))[:rows]
+    model._lookup.cache_clear()
+    timings = {}
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        for description in descriptions:
+            model.categorize(description)
+        elapsed = time.perf_counter() - started
+        timings[label] = len(descriptions) / elapsed if elapsed else float("inf")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Categorize expenses locally.")
+    parser.add_argument("--tenant", default=None, help="tenant database (default: the default one)")
+    parser.add_argument(
+        "--backfill", action="store_true", help="categorize every uncategorized expense"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="count, but do not write")
+    parser.add_argument("--bench", type=int, default=0, help="time classifying N descriptions")
+    parser.add_argument("text", nargs="*", help="descriptions to classify")
+    args = parser.parse_args()
+
+    with db.use_tenant(args.tenant):
+        db.init_db()
+        if args.backfill:
+            started = time.perf_counter()
+            scanned, assigned = backfill(dry_run=args.dry_run)
+            elapsed = time.perf_counter() - started
+            verb = "Would assign" if args.dry_run else "Assigned"
+            print(
+                f"{verb} categories to {assigned} of {scanned} uncategorized expense(s) "
+                f"in {elapsed:.2f}s."
+            )
+        if args.bench:
+            timings = benchmark(args.bench)
+            print(
+                f"Classified {args.bench} descriptions: {timings['cold']:.0f} rows/s cold cache, "
+                f"{timings['warm']:.0f} rows/s warm cache."
+            )
+        model = for_tenant()
+        for text in args.text:
+            print(f"{text!r}: {model.categorize(text) or '(no category)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,48 @@ genai.configure(api_key=GEMINI_API_KEY)
 
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
 MODEL = genai.GenerativeModel(MODEL_NAME)
+# "compact" (schema lines generated from the action specs) or "verbose"
+# (the original long-form prompt).
+PROMPT_STYLE = os.getenv("PROMPT_STYLE", "compact")
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1") != "0"
+# Micro-batching of concurrent planning requests; 0 disables it.
+PLANNER_BATCH_WINDOW_MS = int(os.getenv("PLANNER_BATCH_WINDOW_MS", "0"))
+PLANNER_BATCH_MAX = int(os.getenv("PLANNER_BATCH_MAX", "16"))
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = os.getenv("DB_PATH", str(BASE_DIR / "expense_manager.db"))
-LOG_DIR = BASE_DIR / "logs"
-REPORTS_DIR = BASE_DIR / "reports"
+# Idle SQLite connections kept open, across all tenant databases.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+TENANT_DB_DIR = Path(os.getenv("TENANT_DB_DIR", str(BASE_DIR / "tenants")))
+LOG_DIR = Path(os.getenv("LOG_DIR", str(BASE_DIR / "logs")))
+REPORTS_DIR = Path(os.getenv("REPORTS_DIR", str(BASE_DIR / "reports")))
+
+# Database instrumentation: per-statement timings, a slow-query log with
+# query plans (0 disables it) and cProfile sampling of a fraction of requests.
+DB_INSTRUMENT = os.getenv("DB_INSTRUMENT", "1") != "0"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", str(BASE_DIR / "backups")))
+BACKUP_INTERVAL_SECONDS = int(os.getenv("BACKUP_INTERVAL_SECONDS", "86400"))
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+# Pages copied per backup step (1 MiB with the default 4 KiB page size).
+BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+
+# Local expense categorizer: expenses added without a category get one
+# when the model is at least this confident.
+AUTO_CATEGORIZE = os.getenv("AUTO_CATEGORIZE", "1") != "0"
+CATEGORIZER_MIN_CONFIDENCE = float(os.getenv("CATEGORIZER_MIN_CONFIDENCE", "0.6"))
+CATEGORIZER_TRAIN_LIMIT = int(os.getenv("CATEGORIZER_TRAIN_LIMIT", "50000"))
+
+# Idempotency keys of retried requests are remembered this long.
+IDEMPOTENCY_TTL_DAYS = int(os.getenv("IDEMPOTENCY_TTL_DAYS", "30"))
+# Change-feed entries are kept this long; a consumer further behind resyncs.
+CHANGE_LOG_TTL_DAYS = int(os.getenv("CHANGE_LOG_TTL_DAYS", "7"))
+
+BILL_HORIZON_DAYS = int(os.getenv("BILL_HORIZON_DAYS", "45"))
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "3600"))
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
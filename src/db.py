@@ -1,19 +1,184 @@
+import re
 import sqlite3
-from datetime import date
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-from .config import DB_PATH
+from .config import DB_INSTRUMENT, DB_PATH, DB_POOL_SIZE, TENANT_DB_DIR
+from .profiling import InstrumentedConnection
 
+UNCATEGORIZED = "Other"
+ALL_MONTHS = "*"
+DEFAULT_TENANT = "default"
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Row fields recorded in change_log for each watched table.
+CHANGE_LOG_COLUMNS = {
+    "expenses": ("date", "amount", "currency", "category", "description"),
+    "bills": ("name", "amount", "currency", "due_date", "is_paid", "notes", "template_id"),
+}
+
+
+class DuplicateWrite(Exception):
+    # Raised when an idempotency key was already used; ``record_id`` is the
+    # row the first write created.
+    def __init__(self, record_id: int):
+        super().__init__(f"Duplicate write of record #{record_id}.")
+        self.record_id = record_id
+
+
+_TENANT_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_current_tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+# Idle connections per tenant, least recently used tenant first. At most
+# DB_POOL_SIZE connections stay open across all shards.
+_pool_lock = threading.Lock()
+_idle_connections: "OrderedDict[str, List[sqlite3.Connection]]" = OrderedDict()
+_idle_count = 0
+_schema_lock = threading.Lock()
+_schema_ready = set()
+# (tenant, connection) pinned by read_snapshot() for the current context.
+_pinned: ContextVar[Optional[Tuple[str, sqlite3.Connection]]] = ContextVar(
+    "pinned_connection", default=None
+)
+
+
+def current_tenant() -> str:
+    return _current_tenant.get()
+
+
+@contextmanager
+def use_tenant(tenant: Optional[str]) -> Iterator[str]:
+    # Selects the tenant's database for every db call made in this context
+    # (thread or task). None means the default tenant.
+    tenant = tenant or DEFAULT_TENANT
+    if not _TENANT_ID.match(tenant):
+        raise ValueError(f"Invalid tenant id: {tenant!r}")
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def db_path_for(tenant: str) -> str:
+    # The default tenant keeps using DB_PATH; every other tenant gets its
+    # own file, so writers of different tenants never share a lock.
+    if tenant == DEFAULT_TENANT:
+        return DB_PATH
+    TENANT_DB_DIR.mkdir(parents=True, exist_ok=True)
+    return str(TENANT_DB_DIR / f"{tenant}.db")
+
+
+def list_tenants() -> List[str]:
+    tenants = [DEFAULT_TENANT]
+    if TENANT_DB_DIR.exists():
+        # Yearly archive files ("<tenant>.expenses-<year>.db") are not tenants.
+        tenants.extend(
+            sorted(p.stem for p in TENANT_DB_DIR.glob("*.db") if _TENANT_ID.match(p.stem))
+        )
+    return tenants
+
+
+def get_connection(tenant: Optional[str] = None):
+    # check_same_thread=False lets pooled connections move between worker
+    # threads; the pool hands each one to a single borrower at a time.
+    tenant = tenant or current_tenant()
+    conn = sqlite3.connect(
+        db_path_for(tenant),
+        check_same_thread=False,
+        factory=InstrumentedConnection if DB_INSTRUMENT else sqlite3.Connection,
+    )
     conn.row_factory = sqlite3.Row
+    if DB_INSTRUMENT:
+        conn.tenant = tenant
+    if tenant not in _schema_ready:
+        # A tenant's file is created and migrated on first use.
+        with _schema_lock:
+            if tenant not in _schema_ready:
+                _create_schema(conn)
+                _schema_ready.add(tenant)
     return conn
 
 
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    global _idle_count
+    tenant = current_tenant()
+    pinned = _pinned.get()
+    if pinned is not None and pinned[0] == tenant:
+        yield pinned[1]
+        return
+    conn = None
+    with _pool_lock:
+        idle = _idle_connections.get(tenant)
+        if idle:
+            conn = idle.pop()
+            _idle_count -= 1
+            if not idle:
+                del _idle_connections[tenant]
+    if conn is None:
+        conn = get_connection(tenant)
+
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        evicted: List[sqlite3.Connection] = []
+        with _pool_lock:
+            _idle_connections.setdefault(tenant, []).append(conn)
+            _idle_connections.move_to_end(tenant)
+            _idle_count += 1
+            while _idle_count > DB_POOL_SIZE:
+                lru_tenant, lru_idle = next(iter(_idle_connections.items()))
+                evicted.append(lru_idle.pop(0))
+                _idle_count -= 1
+                if not lru_idle:
+                    del _idle_connections[lru_tenant]
+        for old in evicted:
+            old.close()
+
+
+@contextmanager
+def read_snapshot() -> Iterator[None]:
+    # Every read made in this context sees the same committed state: one
+    # connection is pinned and held in a read transaction. Read-only; the
+    # archive-attaching paths cannot run inside it.
+    with connection() as conn:
+        conn.execute("BEGIN")
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+        token = _pinned.set((current_tenant(), conn))
+        try:
+            yield
+        finally:
+            _pinned.reset(token)
+
+
+def close_all_connections() -> None:
+    global _idle_count
+    with _pool_lock:
+        idle = [c for conns in _idle_connections.values() for c in conns]
+        _idle_connections.clear()
+        _idle_count = 0
+    for conn in idle:
+        conn.close()
+
+
 def init_db():
-    conn = get_connection()
+    # The schema is created/migrated on a tenant's first connection; opening
+    # one here does that at startup instead of on the first request.
+    with connection():
+        pass
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
     cur = conn.cursor()
+    # WAL lets readers (API workers, the web UI) run alongside a writer.
+    cur.execute("PRAGMA journal_mode=WAL")
 
     cur.execute(
         '''
@@ -28,6 +193,31 @@ def init_db():
         );
         '''
     )
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date)')
+
+    # Closed years moved out of `expenses` into per-year files, and their
+    # per-category totals so summaries need not open those files.
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS expense_archives (
+            year INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            archived_at TEXT NOT NULL
+        );
+        '''
+    )
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS expense_rollups (
+            year INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total REAL NOT NULL,
+            PRIMARY KEY (year, category, currency)
+        );
+        '''
+    )
 
     cur.execute(
         '''
@@ -43,131 +233,474 @@ def init_db():
         '''
     )
 
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS bill_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            amount REAL NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'VND',
+            rule TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            next_due TEXT NOT NULL,
+            notes TEXT,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        '''
+    )
+    cur.execute(
+        'CREATE INDEX IF NOT EXISTS idx_bill_templates_next_due '
+        'ON bill_templates (active, next_due)'
+    )
+
+    cur.execute("PRAGMA table_info(bills)")
+    if "template_id" not in {r["name"] for r in cur.fetchall()}:
+        cur.execute("ALTER TABLE bills ADD COLUMN template_id INTEGER")
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_bills_due ON bills (due_date)')
+    cur.execute(
+        'CREATE INDEX IF NOT EXISTS idx_bills_unpaid_due ON bills (is_paid, due_date)'
+    )
+    cur.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_bills_template_due '
+        'ON bills (template_id, due_date) WHERE template_id IS NOT NULL'
+    )
+
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS budgets (
+            category TEXT NOT NULL COLLATE NOCASE,
+            month TEXT NOT NULL,
+            limit_amount REAL NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'VND',
+            PRIMARY KEY (category, month)
+        );
+        '''
+    )
+
+    # One row per idempotent write (see _claim_key); the primary key makes
+    # spotting a retried write a single index probe.
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            record_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+        '''
+    )
+
+    cur.execute("PRAGMA table_info(budget_spend)")
+    spend_columns = {r["name"] for r in cur.fetchall()}
+    if spend_columns and "currency" not in spend_columns:
+        # Counters from before they were keyed by currency are rebuilt below.
+        cur.execute("DROP TABLE budget_spend")
+    seed_spend = "currency" not in spend_columns
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS budget_spend (
+            category TEXT NOT NULL COLLATE NOCASE,
+            month TEXT NOT NULL,
+            currency TEXT NOT NULL DEFAULT 'VND',
+            spent REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (category, month, currency)
+        );
+        '''
+    )
+    if seed_spend:
+        # Databases created before budgets existed get their counters seeded
+        # once; afterwards add_expense/delete_expense keep them up to date.
+        cur.execute(
+            '''
+            INSERT INTO budget_spend (category, month, currency, spent)
+            SELECT COALESCE(NULLIF(TRIM(category), ''), ?), substr(date, 1, 7),
+                   currency, SUM(amount)
+            FROM expenses
+            GROUP BY 1, 2, 3
+            ''',
+            (UNCATEGORIZED,),
+        )
+
+    # Append-only feed of row changes, written by triggers so every writer
+    # (handlers, the scheduler, the backfill, other processes) is covered.
+    # AUTOINCREMENT keeps seq strictly increasing even after pruning.
+    cur.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            old TEXT,
+            new TEXT,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now'))
+        );
+        '''
+    )
+    for table, columns in CHANGE_LOG_COLUMNS.items():
+        for op, old, new in (
+            ("insert", None, "NEW"),
+            ("update", "OLD", "NEW"),
+            ("delete", "OLD", None),
+        ):
+            row = new or old
+            values = [
+                f"json_object({', '.join(f'{c!r}, {ref}.{c}' for c in columns)})" if ref else "NULL"
+                for ref in (old, new)
+            ]
+            cur.execute(
+                f'''
+                CREATE TRIGGER IF NOT EXISTS change_log_{table}_{op}
+                AFTER {op.upper()} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, op, row_id, old, new)
+                    VALUES ('{table}', '{op}', {row}.id, {values[0]}, {values[1]});
+                END
+                '''
+            )
+
     conn.commit()
-    conn.close()
 
 
-def add_expense(
-    amount: float,
-    currency: str = "VND",
-    category: Optional[str] = None,
-    description: Optional[str] = None,
-    date_str: Optional[str] = None,
-) -> int:
-    if not date_str:
-        date_str = date.today().isoformat()
+def changes_since(seq: int, limit: int = 1000, tables: Optional[Sequence[str]] = None):
+    # Changes with a sequence number above ``seq``, oldest first; ``old`` and
+    # ``new`` are JSON objects of the row (NULL for inserts / deletes).
+    query = 'SELECT seq, table_name, op, row_id, old, new, changed_at FROM change_log WHERE seq > ?'
+    args: List = [seq]
+    if tables:
+        query += f' AND table_name IN ({", ".join("?" * len(tables))})'
+        args.extend(tables)
+    query += ' ORDER BY seq LIMIT ?'
+    args.append(limit)
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, args)
+        return cur.fetchall()
 
-    from datetime import datetime
 
-    now = datetime.utcnow().isoformat(timespec="seconds")
+def change_log_bounds() -> Tuple[int, int]:
+    # (oldest retained seq, latest seq). A consumer whose last seen seq is
+    # below oldest - 1 missed pruned changes and has to resync in full.
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        row = cur.fetchone()
+        latest = row["seq"] if row else 0
+        cur.execute('SELECT MIN(seq) AS oldest FROM change_log')
+        oldest = cur.fetchone()["oldest"]
+        return (oldest if oldest is not None else latest + 1), latest
 
-    conn = get_connection()
-    cur = conn.cursor()
+
+def prune_change_log(before: str) -> int:
+    # Drops changes recorded before ``before`` (an ISO timestamp).
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute('DELETE FROM change_log WHERE changed_at < ?', (before,))
+        conn.commit()
+        return cur.rowcount
+
+
+def _claim_key(cur, key: Optional[str], now: str) -> None:
+    # Claims an idempotency key as the first statement of a write, so the
+    # check and the insert share one transaction. A key that was already
+    # claimed rolls back and raises DuplicateWrite.
+    if key is None:
+        return
     cur.execute(
         '''
-        INSERT INTO expenses (date, amount, currency, category, description, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO idempotency_keys (key, record_id, created_at) VALUES (?, 0, ?)
+        ON CONFLICT(key) DO NOTHING
         ''',
-        (date_str, amount, currency, category, description, now),
+        (key, now),
     )
-    conn.commit()
-    expense_id = cur.lastrowid
-    conn.close()
-    return expense_id
+    if cur.rowcount == 0:
+        cur.execute('SELECT record_id FROM idempotency_keys WHERE key = ?', (key,))
+        record_id = cur.fetchone()["record_id"]
+        cur.connection.rollback()
+        raise DuplicateWrite(record_id)
 
 
-def list_expenses(limit: int = 20):
-    conn = get_connection()
-    cur = conn.cursor()
+def _record_key(cur, key: Optional[str], record_id: int) -> None:
+    if key is not None:
+        cur.execute('UPDATE idempotency_keys SET record_id = ? WHERE key = ?', (record_id, key))
+
+
+def prune_idempotency_keys(before: str) -> int:
+    # Forgets keys claimed before ``before`` (an ISO timestamp).
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (before,))
+        conn.commit()
+        return cur.rowcount
+
+
+def _spend_key(category: Optional[str], date_str: str):
+    return (category or "").strip() or UNCATEGORIZED, date_str[:7]
+
+
+def _bump_spend(
+    cur, category: Optional[str], date_str: str, currency: str, delta: float
+) -> float:
+    # Returns the counter value after the bump, read inside the caller's
+    # transaction so concurrent writers each see their own total.
+    cat, month = _spend_key(category, date_str)
     cur.execute(
         '''
-        SELECT * FROM expenses
-        ORDER BY date DESC, id DESC
-        LIMIT ?
+        INSERT INTO budget_spend (category, month, currency, spent)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(category, month, currency) DO UPDATE SET spent = spent + excluded.spent
         ''',
-        (limit,),
+        (cat, month, currency, delta),
+    )
+    cur.execute(
+        'SELECT spent FROM budget_spend WHERE category = ? AND month = ? AND currency = ?',
+        (cat, month, currency),
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return float(cur.fetchone()["spent"])
 
 
-def get_expenses(
+EXPENSE_COLUMNS = "id, date, amount, currency, category, description, created_at"
+
+def period_range(
     period: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-):
-    conn = get_connection()
-    cur = conn.cursor()
-
+) -> Tuple[Optional[str], Optional[str]]:
+    # Half-open [start, end) date range of a period; None means unbounded.
+    # An explicit start_date/end_date pair is inclusive of end_date.
     if start_date and end_date:
+        end = datetime.strptime(end_date[:10], "%Y-%m-%d").date() + timedelta(days=1)
+        return start_date, end.isoformat()
+    today = date.today()
+    if period == "today":
+        return today.isoformat(), (today + timedelta(days=1)).isoformat()
+    if period == "this_week":
+        monday = today - timedelta(days=today.weekday())
+        return monday.isoformat(), (monday + timedelta(days=7)).isoformat()
+    if period == "this_month":
+        first = today.replace(day=1)
+        next_month_first = (first + timedelta(days=32)).replace(day=1)
+        return first.isoformat(), next_month_first.isoformat()
+    return None, None
+
+
+def _range_filter(start: Optional[str], end: Optional[str]) -> Tuple[str, list]:
+    conditions, args = [], []
+    if start is not None:
+        conditions.append("date >= ?")
+        args.append(start)
+    if end is not None:
+        conditions.append("date < ?")
+        args.append(end)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), args
+
+
+def archive_path(year: int, tenant: Optional[str] = None) -> Path:
+    main = Path(db_path_for(tenant or current_tenant()))
+    return main.with_name(f"{main.stem}.expenses-{year}.db")
+
+
+def _archives_in_range(cur, start: Optional[str], end: Optional[str]) -> List[int]:
+    cur.execute('SELECT year FROM expense_archives ORDER BY year DESC')
+    return [
+        r["year"]
+        for r in cur.fetchall()
+        if (start is None or f"{r['year'] + 1:04d}-01-01" > start)
+        and (end is None or f"{r['year']:04d}-01-01" < end)
+    ]
+
+
+@contextmanager
+def _attached(conn: sqlite3.Connection, years: Sequence[int]) -> Iterator[List[str]]:
+    # Attaches the given archive years for one query and yields the schema
+    # names to read from ("main" first). Hot-only queries attach nothing.
+    schemas = ["main"]
+    try:
+        for year in years:
+            schema = f"archive_{year}"
+            conn.execute("ATTACH DATABASE ? AS " + schema, (str(archive_path(year)),))
+            schemas.append(schema)
+        yield schemas
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        for schema in schemas[1:]:
+            conn.execute("DETACH DATABASE " + schema)
+
+
+def add_expense(
+    amount: float,
+    currency: str = "VND",
+    category: Optional[str] = None,
+    description: Optional[str] = None,
+    date_str: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> Tuple[int, float]:
+    # Returns (expense_id, spent-to-date for the expense's category, month
+    # and currency after this insert). Raises DuplicateWrite if
+    # ``idempotency_key`` was used before.
+    if not date_str:
+        date_str = date.today().isoformat()
+
+    now = datetime.utcnow().isoformat(timespec="seconds")
+
+    with connection() as conn:
+        cur = conn.cursor()
+        _claim_key(cur, idempotency_key, now)
         cur.execute(
             '''
-            SELECT * FROM expenses
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date ASC
+            INSERT INTO expenses (date, amount, currency, category, description, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
             ''',
-            (start_date, end_date),
+            (date_str, amount, currency, category, description, now),
         )
-    elif period == "today":
-        today = date.today().isoformat()
+        expense_id = cur.lastrowid
+        _record_key(cur, idempotency_key, expense_id)
+        spent = _bump_spend(cur, category, date_str, currency, amount)
+        conn.commit()
+        return expense_id, spent
+
+
+def list_expenses(limit: int = 20):
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute(
-            '''
-            SELECT * FROM expenses
-            WHERE date = ?
-            ORDER BY date ASC
+            f'''
+            SELECT {EXPENSE_COLUMNS} FROM expenses
+            ORDER BY date DESC, id DESC
+            LIMIT ?
             ''',
-            (today,),
+            (limit,),
         )
-    elif period == "this_week":
-        today = date.today()
-        iso = today.isocalendar()
-        monday = date.fromisocalendar(iso.year, iso.week, 1)
-        sunday = date.fromisocalendar(iso.year, iso.week, 7)
+        rows = cur.fetchall()
+        if len(rows) == limit:
+            return rows
+
+        # The current partition is short: fill up from the archived years.
+        years = _archives_in_range(cur, None, None)
+        if not years:
+            return rows
+        with _attached(conn, years) as schemas:
+            union = " UNION ALL ".join(
+                f"SELECT {EXPENSE_COLUMNS} FROM {schema}.expenses" for schema in schemas
+            )
+            cur.execute(f"{union} ORDER BY date DESC, id DESC LIMIT ?", (limit,))
+            return cur.fetchall()
+
+
+def get_expenses(
+    period: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+):
+    start, end = period_range(period, start_date, end_date)
+    where, args = _range_filter(start, end)
+    with connection() as conn:
+        cur = conn.cursor()
+        # Archived years are only read when the range reaches into them.
+        with _attached(conn, _archives_in_range(cur, start, end)) as schemas:
+            union = " UNION ALL ".join(
+                f"SELECT {EXPENSE_COLUMNS} FROM {schema}.expenses{where}" for schema in schemas
+            )
+            cur.execute(f"{union} ORDER BY date ASC", args * len(schemas))
+            rows = cur.fetchall()
+        return rows
+
+
+def delete_expense(expense_id: int) -> bool:
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute(
-            '''
-            SELECT * FROM expenses
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date ASC
-            ''',
-            (monday.isoformat(), sunday.isoformat()),
+            'SELECT date, amount, currency, category FROM expenses WHERE id = ?', (expense_id,)
         )
-    elif period == "this_month":
-        today = date.today()
-        first = today.replace(day=1)
-        if today.month == 12:
-            next_month_first = today.replace(year=today.year + 1, month=1, day=1)
-        else:
-            next_month_first = today.replace(month=today.month + 1, day=1)
+        row = cur.fetchone()
+        if row is not None:
+            cur.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
+            _bump_spend(cur, row["category"], row["date"], row["currency"], -row["amount"])
+            conn.commit()
+            return True
+
+        # Not in the current partition: look through the archived years.
+        for year in _archives_in_range(cur, None, None):
+            with _attached(conn, [year]) as schemas:
+                archive = schemas[1]
+                cur.execute(
+                    f'SELECT date, amount, currency, category FROM {archive}.expenses WHERE id = ?',
+                    (expense_id,),
+                )
+                row = cur.fetchone()
+                if row is None:
+                    continue
+                cur.execute(f'DELETE FROM {archive}.expenses WHERE id = ?', (expense_id,))
+                cat, _ = _spend_key(row["category"], row["date"])
+                cur.execute(
+                    '''
+                    UPDATE expense_rollups SET count = count - 1, total = total - ?
+                    WHERE year = ? AND category = ? AND currency = ?
+                    ''',
+                    (row["amount"], year, cat, row["currency"]),
+                )
+                _bump_spend(cur, row["category"], row["date"], row["currency"], -row["amount"])
+                conn.commit()
+                return True
+        return False
+
+
+def labeled_expenses(limit: int):
+    # Recent (description, category) pairs, used to train the categorizer.
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute(
             '''
-            SELECT * FROM expenses
-            WHERE date >= ? AND date < ?
-            ORDER BY date ASC
+            SELECT description, category FROM expenses
+            WHERE TRIM(COALESCE(description, '')) != '' AND TRIM(COALESCE(category, '')) != ''
+            ORDER BY id DESC
+            LIMIT ?
             ''',
-            (first.isoformat(), next_month_first.isoformat()),
+            (limit,),
         )
-    else:
+        return cur.fetchall()
+
+
+def uncategorized_expenses(after_id: int = 0, limit: int = 5000):
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute(
             '''
-            SELECT * FROM expenses
-            ORDER BY date ASC
-            '''
+            SELECT id, description FROM expenses
+            WHERE TRIM(COALESCE(category, '')) = '' AND id > ?
+            ORDER BY id
+            LIMIT ?
+            ''',
+            (after_id, limit),
         )
+        return cur.fetchall()
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
-
-def delete_expense(expense_id: int) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
-    conn.commit()
-    deleted = cur.rowcount > 0
-    conn.close()
-    return deleted
+def assign_expense_categories(assignments: Sequence[Tuple[int, str]]) -> int:
+    # Sets the category of still-uncategorized expenses and moves their
+    # amounts between budget_spend counters in the same transaction.
+    # Returns the number of rows updated.
+    updated = 0
+    with connection() as conn:
+        cur = conn.cursor()
+        for expense_id, category in assignments:
+            cur.execute(
+                '''
+                SELECT date, amount, currency FROM expenses
+                WHERE id = ? AND TRIM(COALESCE(category, '')) = ''
+                ''',
+                (expense_id,),
+            )
+            row = cur.fetchone()
+            if row is None:
+                continue
+            cur.execute("UPDATE expenses SET category = ? WHERE id = ?", (category, expense_id))
+            _bump_spend(cur, None, row["date"], row["currency"], -row["amount"])
+            _bump_spend(cur, category, row["date"], row["currency"], row["amount"])
+            updated += 1
+        conn.commit()
+    return updated
 
 
 def add_bill(
@@ -176,53 +709,354 @@ def add_bill(
     currency: str = "VND",
     due_date: str = "",
     notes: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
 ) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        '''
-        INSERT INTO bills (name, amount, currency, due_date, notes)
-        VALUES (?, ?, ?, ?, ?)
-        ''',
-        (name, amount, currency, due_date, notes),
-    )
-    conn.commit()
-    bill_id = cur.lastrowid
-    conn.close()
-    return bill_id
+    with connection() as conn:
+        cur = conn.cursor()
+        _claim_key(cur, idempotency_key, datetime.utcnow().isoformat(timespec="seconds"))
+        cur.execute(
+            '''
+            INSERT INTO bills (name, amount, currency, due_date, notes)
+            VALUES (?, ?, ?, ?, ?)
+            ''',
+            (name, amount, currency, due_date, notes),
+        )
+        bill_id = cur.lastrowid
+        _record_key(cur, idempotency_key, bill_id)
+        conn.commit()
+        return bill_id
 
 
 def list_bills(include_paid: bool = False):
-    conn = get_connection()
-    cur = conn.cursor()
-    if include_paid:
+    with connection() as conn:
+        cur = conn.cursor()
+        if include_paid:
+            cur.execute(
+                '''
+                SELECT * FROM bills
+                ORDER BY due_date ASC
+                '''
+            )
+        else:
+            cur.execute(
+                '''
+                SELECT * FROM bills
+                WHERE is_paid = 0
+                ORDER BY due_date ASC
+                '''
+            )
+        rows = cur.fetchall()
+        return rows
+
+
+def mark_bill_paid(bill_id: int) -> bool:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            'UPDATE bills SET is_paid = 1 WHERE id = ? AND is_paid = 0',
+            (bill_id,),
+        )
+        conn.commit()
+        updated = cur.rowcount > 0
+        return updated
+
+
+def upcoming_bills(start_date: str, end_date: str):
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute(
             '''
             SELECT * FROM bills
+            WHERE is_paid = 0 AND due_date BETWEEN ? AND ?
             ORDER BY due_date ASC
-            '''
+            ''',
+            (start_date, end_date),
         )
-    else:
+        rows = cur.fetchall()
+        return rows
+
+
+def overdue_bills(as_of: str):
+    with connection() as conn:
+        cur = conn.cursor()
         cur.execute(
             '''
             SELECT * FROM bills
-            WHERE is_paid = 0
+            WHERE is_paid = 0 AND due_date > '' AND due_date < ?
             ORDER BY due_date ASC
+            ''',
+            (as_of,),
+        )
+        rows = cur.fetchall()
+        return rows
+
+
+def add_bill_template(
+    name: str,
+    amount: float,
+    rule: str,
+    start_date: str,
+    next_due: str,
+    currency: str = "VND",
+    end_date: Optional[str] = None,
+    notes: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> int:
+    with connection() as conn:
+        cur = conn.cursor()
+        _claim_key(cur, idempotency_key, datetime.utcnow().isoformat(timespec="seconds"))
+        cur.execute(
             '''
+            INSERT INTO bill_templates
+                (name, amount, currency, rule, start_date, end_date, next_due, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (name, amount, currency, rule, start_date, end_date, next_due, notes),
         )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+        template_id = cur.lastrowid
+        _record_key(cur, idempotency_key, template_id)
+        conn.commit()
+        return template_id
 
 
-def mark_bill_paid(bill_id: int) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        'UPDATE bills SET is_paid = 1 WHERE id = ? AND is_paid = 0',
-        (bill_id,),
-    )
-    conn.commit()
-    updated = cur.rowcount > 0
-    conn.close()
-    return updated
+def get_due_bill_templates(until: str, limit: int, template_id: Optional[int] = None):
+    with connection() as conn:
+        cur = conn.cursor()
+        query = 'SELECT * FROM bill_templates WHERE active = 1 AND next_due <= ?'
+        args: List = [until]
+        if template_id is not None:
+            query += ' AND id = ?'
+            args.append(template_id)
+        query += ' ORDER BY next_due ASC, id ASC LIMIT ?'
+        args.append(limit)
+        cur.execute(query, args)
+        rows = cur.fetchall()
+        return rows
+
+
+def materialize_bills(instances: List[tuple], template_updates: List[tuple]) -> int:
+    # instances: (name, amount, currency, due_date, notes, template_id)
+    # template_updates: (next_due, active, template_id)
+    with connection() as conn:
+        cur = conn.cursor()
+        before = conn.total_changes
+        cur.executemany(
+            '''
+            INSERT OR IGNORE INTO bills (name, amount, currency, due_date, notes, template_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''',
+            instances,
+        )
+        inserted = conn.total_changes - before
+        cur.executemany(
+            'UPDATE bill_templates SET next_due = ?, active = ? WHERE id = ?',
+            template_updates,
+        )
+        conn.commit()
+        return inserted
+
+
+def expense_totals_by_category(start_date: Optional[str], end_date: Optional[str]):
+    # Totals per category and currency over [start_date, end_date); None is
+    # unbounded. Archived years fully inside the range come from the rollups,
+    # archived years cut by the range are read from their files.
+    where, args = _range_filter(start_date, end_date)
+    with connection() as conn:
+        cur = conn.cursor()
+        partial, rolled = [], []
+        for year in _archives_in_range(cur, start_date, end_date):
+            inside = (start_date is None or start_date <= f"{year:04d}-01-01") and (
+                end_date is None or f"{year + 1:04d}-01-01" <= end_date
+            )
+            (rolled if inside else partial).append(year)
+
+        with _attached(conn, partial) as schemas:
+            parts = [
+                f'''
+                SELECT COALESCE(NULLIF(TRIM(category), ''), ?) AS category,
+                       currency, COUNT(*) AS count, SUM(amount) AS total
+                FROM {schema}.expenses{where}
+                GROUP BY 1, 2
+                '''
+                for schema in schemas
+            ]
+            part_args: list = [UNCATEGORIZED, *args] * len(schemas)
+            if rolled:
+                parts.append(
+                    f'''
+                    SELECT category, currency, count, total FROM expense_rollups
+                    WHERE year IN ({", ".join("?" * len(rolled))})
+                    '''
+                )
+                part_args.extend(rolled)
+            cur.execute(
+                f'''
+                SELECT category, currency, SUM(count) AS count, SUM(total) AS total
+                FROM ({" UNION ALL ".join(parts)})
+                GROUP BY 1, 2
+                HAVING SUM(count) > 0
+                ORDER BY total DESC
+                ''',
+                part_args,
+            )
+            rows = cur.fetchall()
+        return rows
+
+
+def archived_years() -> List[int]:
+    with connection() as conn:
+        return _archives_in_range(conn.cursor(), None, None)
+
+
+def hot_expense_years(before: int) -> List[int]:
+    # Years before ``before`` that still have rows in the current partition.
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT DISTINCT substr(date, 1, 4) AS year FROM expenses WHERE date < ? ORDER BY 1",
+            (f"{before:04d}-01-01",),
+        )
+        return [int(r["year"]) for r in cur.fetchall()]
+
+
+def archive_year(year: int) -> int:
+    # Moves a closed year's expenses into their own file and records its
+    # rollups. Returns the number of rows moved; re-running is safe.
+    if year >= date.today().year:
+        raise ValueError(f"Only closed years can be archived, not {year}.")
+    start, end = f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    path = archive_path(year)
+    now = datetime.utcnow().isoformat(timespec="seconds")
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("ATTACH DATABASE ? AS archive", (str(path),))
+        try:
+            cur.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS archive.expenses (
+                    id INTEGER PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    currency TEXT NOT NULL DEFAULT 'VND',
+                    category TEXT,
+                    description TEXT,
+                    created_at TEXT NOT NULL
+                )
+                '''
+            )
+            cur.execute(
+                'CREATE INDEX IF NOT EXISTS archive.idx_expenses_date ON expenses (date)'
+            )
+            cur.execute(
+                f'''
+                INSERT OR IGNORE INTO archive.expenses ({EXPENSE_COLUMNS})
+                SELECT {EXPENSE_COLUMNS} FROM main.expenses WHERE date >= ? AND date < ?
+                ''',
+                (start, end),
+            )
+            # In WAL mode a commit is atomic per file, so the copy is made
+            # durable before the rows leave the current partition.
+            conn.commit()
+
+            cur.execute("DELETE FROM main.expense_rollups WHERE year = ?", (year,))
+            cur.execute(
+                '''
+                INSERT INTO main.expense_rollups (year, category, currency, count, total)
+                SELECT ?, COALESCE(NULLIF(TRIM(category), ''), ?), currency, COUNT(*), SUM(amount)
+                FROM archive.expenses
+                GROUP BY 2, 3
+                ''',
+                (year, UNCATEGORIZED),
+            )
+            cur.execute('SELECT COALESCE(MAX(seq), 0) AS seq FROM main.change_log')
+            last_seq = cur.fetchone()["seq"]
+            cur.execute(
+                "DELETE FROM main.expenses WHERE date >= ? AND date < ?", (start, end)
+            )
+            moved = cur.rowcount
+            # The rows moved rather than disappeared: consumers of the change
+            # feed must not treat them as deletions.
+            cur.execute(
+                '''
+                UPDATE main.change_log SET op = 'archive'
+                WHERE seq > ? AND table_name = 'expenses' AND op = 'delete'
+                ''',
+                (last_seq,),
+            )
+            cur.execute(
+                '''
+                INSERT INTO main.expense_archives (year, path, archived_at) VALUES (?, ?, ?)
+                ON CONFLICT(year) DO UPDATE SET path = excluded.path, archived_at = excluded.archived_at
+                ''',
+                (year, path.name, now),
+            )
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            cur.execute("DETACH DATABASE archive")
+    return moved
+
+
+def bill_overview(as_of: str, soon: str):
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            SELECT COUNT(*) AS unpaid_count,
+                   COALESCE(SUM(amount), 0) AS unpaid_total,
+                   COALESCE(SUM(due_date > '' AND due_date < ?), 0) AS overdue_count,
+                   COALESCE(SUM(due_date BETWEEN ? AND ?), 0) AS due_soon_count
+            FROM bills
+            WHERE is_paid = 0
+            ''',
+            (as_of, as_of, soon),
+        )
+        row = cur.fetchone()
+        return row
+
+
+def set_budget(
+    category: str,
+    limit_amount: float,
+    month: Optional[str] = None,
+    currency: str = "VND",
+) -> None:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            INSERT INTO budgets (category, month, limit_amount, currency)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(category, month) DO UPDATE SET
+                limit_amount = excluded.limit_amount,
+                currency = excluded.currency
+            ''',
+            (category.strip(), month or ALL_MONTHS, limit_amount, currency),
+        )
+        conn.commit()
+
+
+def get_budget_status(month: str, category: Optional[str] = None):
+    # A budget set for a specific month overrides the every-month ('*') one.
+    with connection() as conn:
+        cur = conn.cursor()
+        query = '''
+            SELECT b.category, b.limit_amount, b.currency, b.month AS budget_month,
+                   COALESCE(s.spent, 0) AS spent
+            FROM budgets b
+            LEFT JOIN budget_spend s
+                ON s.category = b.category AND s.month = ? AND s.currency = b.currency
+            WHERE (b.month = ? OR (b.month = ? AND NOT EXISTS (
+                SELECT 1 FROM budgets o WHERE o.category = b.category AND o.month = ?
+            )))
+        '''
+        args: List = [month, month, ALL_MONTHS, month]
+        if category is not None:
+            query += " AND b.category = ?"
+            args.append(category)
+        query += " ORDER BY b.category ASC"
+        cur.execute(query, args)
+        rows = cur.fetchall()
+        return rows
@@ -0,0 +1,107 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+from google.api_core.exceptions import ResourceExhausted
+
+from . import llm_client
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough stand-in for the real tokenizer (about 4 characters per token).
+    return max(1, len(text) // 4)
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeCountTokens:
+    def __init__(self, total_tokens: int):
+        self.total_tokens = total_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt_tokens, estimate_tokens(text))
+
+
+class FakeModel:
+    # Offline stand-in for the Gemini model used by load tests and benchmarks.
+    # It answers with a plausible plan derived from keywords in the request.
+
+    def __init__(self, latency: float = 0.05, rate_limit: float = 0.0):
+        self.latency = latency
+        # Calls allowed per rolling second (0 = unlimited); extra calls fail
+        # with ResourceExhausted like the real API's rate limit.
+        self.rate_limit = rate_limit
+        self.calls = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._recent: "deque[float]" = deque()
+
+    def _check_rate(self) -> None:
+        with self._lock:
+            self.calls += 1
+            if self.rate_limit <= 0:
+                return
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.rejected += 1
+                raise ResourceExhausted("Fake model rate limit exceeded.")
+            self._recent.append(now)
+
+    def generate_content(self, contents: List[Any], **kwargs) -> FakeResponse:
+        self._check_rate()
+        if self.latency > 0:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(c) for c in contents)
+        if llm_client.BATCH_MARKER in prompt:
+            texts = json.loads(prompt.split(llm_client.BATCH_MARKER, 1)[1])
+            text = json.dumps([fake_plan(t) for t in texts])
+        else:
+            text = json.dumps(fake_plan(prompt.rsplit("User request:\n", 1)[-1]))
+        return FakeResponse(text, estimate_tokens(prompt))
+
+    def count_tokens(self, contents: List[Any], **kwargs) -> FakeCountTokens:
+        return FakeCountTokens(estimate_tokens("\n".join(str(c) for c in contents)))
+
+
+def fake_plan(user_text: str) -> Dict[str, Any]:
+    text = user_text.lower()
+    amount_match = re.search(r"\d+(?:\.\d+)?", text)
+    amount = float(amount_match.group(0)) if amount_match else 0.0
+
+    if "bill" in text and "add" in text:
+        action = {
+            "type": "add_bill",
+            "params": {"name": "Bill", "amount": amount, "due_date": "2030-01-01"},
+        }
+    elif "bill" in text:
+        action = {"type": "list_bills", "params": {"include_paid": False}}
+    elif "summar" in text:
+        action = {"type": "summarize_expenses", "params": {"period": "this_month"}}
+    elif "add" in text or "spent" in text:
+        action = {
+            "type": "add_expense",
+            "params": {"amount": amount, "category": "Food", "description": user_text[:40]},
+        }
+    else:
+        action = {"type": "list_expenses", "params": {"limit": 10}}
+
+    return {"plan": f"Fake plan for: {user_text[:60]}", "actions": [action]}
+
+
+def install_fake_model(latency: float = 0.05, rate_limit: float = 0.0) -> FakeModel:
+    model = FakeModel(latency=latency, rate_limit=rate_limit)
+    llm_client.MODEL = model
+    return model
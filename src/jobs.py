@@ -0,0 +1,89 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from . import db
+from .agent import execute_plan, plan_user_input
+from .safety import CONFIRM_ALLOW, WRITE_ACTIONS
+
+JOB_QUEUED = "queued"
+JOB_PLANNING = "planning"
+JOB_EXECUTING = "executing"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+FINISHED_STATES = (JOB_DONE, JOB_ERROR)
+
+
+class JobQueue:
+    # Runs agent requests off the caller's thread (e.g. the Streamlit script
+    # thread) and exposes their progress for polling.
+
+    def __init__(self, max_workers: int = 2, confirm_policy: str = CONFIRM_ALLOW):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._confirm_policy = confirm_policy
+        # Bumped whenever a finished job wrote to the database, so readers can
+        # key their caches on it.
+        self.data_version = 0
+
+    def submit(
+        self, user_text: str, tenant: Optional[str] = None, request_id: Optional[str] = None
+    ) -> str:
+        # Jobs submitted with the same ``request_id`` write their inserts once.
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "user_text": user_text,
+                "tenant": tenant,
+                "request_id": request_id,
+                "status": JOB_QUEUED,
+                "submitted_at": time.time(),
+                "finished_at": None,
+                "plan": None,
+                "results": [],
+                "error": None,
+            }
+        self._executor.submit(self._run, job_id, user_text, tenant, request_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(
+        self, job_id: str, user_text: str, tenant: Optional[str], request_id: Optional[str]
+    ) -> None:
+        wrote = False
+        final: Dict[str, Any]
+        try:
+            self._update(job_id, status=JOB_PLANNING)
+            plan, actions = plan_user_input(user_text)
+            self._update(job_id, status=JOB_EXECUTING, plan=plan)
+            wrote = any(a.get("type") in WRITE_ACTIONS for a in actions)
+            with db.use_tenant(tenant):
+                result = execute_plan(
+                    user_text,
+                    plan,
+                    actions,
+                    confirm_policy=self._confirm_policy,
+                    request_id=request_id,
+                )
+            final = {"status": JOB_DONE, "plan": result["plan"], "results": result["results"]}
+        except Exception as e:
+            final = {"status": JOB_ERROR, "error": str(e)}
+
+        # The version bump and the final status are published together so a
+        # poller that sees the job finished also sees the new data version.
+        with self._lock:
+            if wrote:
+                self.data_version += 1
+            self._jobs[job_id].update(final, finished_at=time.time())
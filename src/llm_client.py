@@ -1,12 +1,26 @@
 import json
 import re
+import threading
 import time
-from datetime import date
-from typing import Any, Dict, List, Tuple
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from google.api_core.exceptions import ResourceExhausted, GoogleAPIError
 
-from .config import MODEL
+from .actions import describe_actions
+from .config import LLM_JSON_MODE, LOG_DIR, MODEL, PROMPT_STYLE
+
+PROMPT_COMPACT = "compact"
+PROMPT_VERBOSE = "verbose"
+PROMPT_STYLES = (PROMPT_COMPACT, PROMPT_VERBOSE)
+USAGE_LOG = "llm_usage.log"
+BATCH_MARKER = "User requests (JSON array):\n"
+BATCH_INSTRUCTIONS = (
+    "Plan each of the {count} independent requests below separately. Reply with a JSON "
+    "array of exactly {count} objects in the same order, each shaped "
+    '{{"plan": ..., "actions": [...]}} as described above.'
+)
 
 
 SYSTEM_PROMPT = """
@@ -24,7 +38,9 @@ The JSON MUST have the structure:
       "type": "add_expense" | "list_expenses" | "summarize_expenses" |
               "add_bill"    | "list_bills"    | "summarize_bills"    |
               "generate_report_file" | "delete_expense" | "mark_bill_paid" |
-              "plan_savings_goal" | "spending_health_check",
+              "plan_savings_goal" | "spending_health_check" |
+              "set_budget" | "budget_status" | "add_recurring_bill" |
+              "upcoming_bills" | "overdue_bills",
       "params": { ... }
     },
     ...
@@ -104,6 +120,41 @@ Action details:
    - params:
      - period: one of "today" | "this_week" | "this_month" | "all"
 
+12) set_budget
+   - Set a monthly spending limit for a category.
+   - params:
+     - category: string category, e.g. "Food"
+     - amount: float, the monthly limit
+     - currency: string, default "VND"
+     - month: optional month string YYYY-MM. Omit (null) to apply the budget to every month.
+
+13) budget_status
+   - Show spending against each category budget for a month.
+   - params:
+     - month: month string YYYY-MM (default: the current month)
+
+14) add_recurring_bill
+   - Create a recurring bill (rent, subscriptions, utilities); upcoming instances are scheduled automatically.
+   - params:
+     - name: bill name (e.g. "Rent")
+     - amount: float
+     - currency: string, default "VND"
+     - frequency: "monthly" | "weekly" | "daily" | "yearly", or a rule such as
+       "FREQ=MONTHLY;INTERVAL=2;BYMONTHDAY=15" or "FREQ=WEEKLY;BYDAY=FR"
+     - start_date: date string YYYY-MM-DD of the first due date (default today);
+       occurrences before today are not created
+     - end_date: optional date string YYYY-MM-DD after which the bill stops recurring
+     - notes: optional additional notes (can be null)
+
+15) upcoming_bills
+   - List unpaid bills due within the next N days.
+   - params:
+     - days: integer (default 7)
+
+16) overdue_bills
+   - List unpaid bills whose due date has already passed.
+   - params: {}
+
 General rules:
 - Only use the action types listed above. DO NOT invent new types.
 - Always produce valid JSON.
@@ -133,37 +184,129 @@ Possible JSON response:
 """.strip()
 
 
-def _extract_json(text: str) -> Dict[str, Any]:
+COMPACT_HEADER = """
+You plan actions for a personal expense & bills agent. Read the user's request
+(English or Vietnamese) and reply with ONE JSON object and nothing else:
+{"plan": "<short English description>", "actions": [{"type": "<action>", "params": {...}}]}
+
+Actions (name?: optional, = default):
+""".strip()
+
+COMPACT_RULES = """
+Rules: only use these actions. If the request is unrelated to expenses or bills,
+explain that in "plan" and return "actions": [].
+Example: "Help me save 20,000,000 VND by June 2026. I already have 5,000,000 VND." ->
+{"plan": "Compute the monthly and weekly saving needed.", "actions": [{"type": "plan_savings_goal",
+"params": {"target_amount": 20000000, "current_savings": 5000000, "deadline": "2026-06-01"}}]}
+""".strip()
+
+
+@lru_cache(maxsize=None)
+def prompt_prefix(style: str = PROMPT_STYLE) -> str:
+    # Everything except the date line is static, so it is assembled once.
+    if style == PROMPT_COMPACT:
+        return f"{COMPACT_HEADER}\n{describe_actions()}\n\n{COMPACT_RULES}"
+    if style == PROMPT_VERBOSE:
+        return f"{SYSTEM_PROMPT}\n\n{DETAIL_PROMPT}"
+    raise ValueError(f"Unknown prompt style: {style}")
+
+
+def _date_line(style: str, today_str: str) -> str:
+    if style == PROMPT_VERBOSE:
+        return (
+            f"Today's date is {today_str}.\n"
+            f"If the user says 'today', you MUST use exactly this date string ('{today_str}') "
+            f"for any 'date' field.\n"
+            f"For 'this_week' and 'this_month', you may infer ranges based on this date."
+        )
+    return f"Today is {today_str}; use it for 'today' dates and to infer this_week/this_month."
+
+
+def build_contents(user_text: str, style: str = PROMPT_STYLE, today: Optional[date] = None) -> List[str]:
+    today_str = (today or date.today()).isoformat()
+    return [
+        prompt_prefix(style),
+        f"{_date_line(style, today_str)}\n\nUser request:\n{user_text}",
+    ]
+
+
+class TokenUsage:
+    # Process-wide totals of the planner's LLM calls; each call is also
+    # appended to logs/llm_usage.log.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.json_fallbacks = 0
+
+    def record(self, prompt_tokens: int, output_tokens: int, json_fallback: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            self.json_fallbacks += int(json_fallback)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.calls
+            return {
+                "calls": calls,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "avg_prompt_tokens": self.prompt_tokens / calls if calls else 0.0,
+                "json_fallbacks": self.json_fallbacks,
+            }
+
+
+USAGE = TokenUsage()
+
+
+def _record_usage(
+    response, style: str, latency_s: float, json_fallback: bool, batch_size: int = 1
+) -> None:
+    meta = getattr(response, "usage_metadata", None)
+    prompt_tokens = int(getattr(meta, "prompt_token_count", 0) or 0)
+    output_tokens = int(getattr(meta, "candidates_token_count", 0) or 0)
+    USAGE.record(prompt_tokens, output_tokens, json_fallback)
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "style": style,
+        "json_mode": LLM_JSON_MODE,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": int(getattr(meta, "total_token_count", 0) or 0),
+        "latency_ms": round(latency_s * 1000.0, 1),
+        "json_fallback": json_fallback,
+        "batch_size": batch_size,
+    }
+    with (LOG_DIR / USAGE_LOG).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def _extract_json(text: str) -> Tuple[Dict[str, Any], bool]:
+    # Returns the parsed object and whether the regex fallback was needed.
     try:
-        return json.loads(text)
+        return json.loads(text), False
     except json.JSONDecodeError:
         match = re.search(r"\{.*\}", text, re.DOTALL)
         if not match:
             raise ValueError("LLM output is not valid JSON and no JSON block could be extracted.")
-        return json.loads(match.group(0))
+        return json.loads(match.group(0)), True
 
 
-def get_actions_from_llm(user_text: str) -> Tuple[str, List[Dict[str, Any]]]:
-    today_str = date.today().isoformat()
-    dynamic = (
-        f"Today's date is {today_str}.\n"
-        f"If the user says 'today', you MUST use exactly this date string ('{today_str}') "
-        f"for any 'date' field.\n"
-        f"For 'this_week' and 'this_month', you may infer ranges based on this date."
-    )
-
-    prompt = (
-        f"{SYSTEM_PROMPT}\n\n"
-        f"{DETAIL_PROMPT}\n\n"
-        f"{dynamic}\n\n"
-        f"User request:\n{user_text}"
-    )
+def _generate(contents: List[str]):
+    kwargs: Dict[str, Any] = {}
+    if LLM_JSON_MODE:
+        kwargs["generation_config"] = {"response_mime_type": "application/json"}
 
     last_error: Exception | None = None
     for attempt in range(3):
         try:
-            response = MODEL.generate_content([prompt])
-            break
+            return MODEL.generate_content(contents, **kwargs)
         except ResourceExhausted as e:
             last_error = e
             time.sleep(2 * (attempt + 1))
@@ -172,12 +315,57 @@ def get_actions_from_llm(user_text: str) -> Tuple[str, List[Dict[str, Any]]]:
             raise RuntimeError(f"LLM API error: {e.message}") from e
         except Exception as e:
             raise RuntimeError(f"Unexpected LLM error: {e}") from e
-    else:
-        raise RuntimeError("LLM rate limit exceeded, please wait and try again.") from last_error
+    raise RuntimeError("LLM rate limit exceeded, please wait and try again.") from last_error
 
-    data = _extract_json(response.text)
+
+def _plan_from_data(data: Any) -> Tuple[str, List[Dict[str, Any]]]:
+    if not isinstance(data, dict):
+        raise ValueError("LLM JSON output is not an object.")
     plan = data.get("plan", "")
     actions = data.get("actions", [])
     if not isinstance(actions, list):
         raise ValueError("The 'actions' field in LLM JSON output is not a list.")
     return plan, actions
+
+
+def get_actions_from_llm(user_text: str) -> Tuple[str, List[Dict[str, Any]]]:
+    started = time.perf_counter()
+    response = _generate(build_contents(user_text))
+    data, fallback = _extract_json(response.text)
+    _record_usage(response, PROMPT_STYLE, time.perf_counter() - started, fallback)
+    return _plan_from_data(data)
+
+
+def build_batch_contents(
+    user_texts: List[str], style: str = PROMPT_STYLE, today: Optional[date] = None
+) -> List[str]:
+    today_str = (today or date.today()).isoformat()
+    return [
+        prompt_prefix(style),
+        f"{_date_line(style, today_str)}\n\n"
+        f"{BATCH_INSTRUCTIONS.format(count=len(user_texts))}\n"
+        f"{BATCH_MARKER}{json.dumps(user_texts, ensure_ascii=False)}",
+    ]
+
+
+def get_actions_batch_from_llm(user_texts: List[str]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    # One call for several independent requests. Raises ValueError when the
+    # reply is not an array of exactly one plan object per request, so the
+    # caller can fall back to single calls.
+    started = time.perf_counter()
+    response = _generate(build_batch_contents(user_texts))
+    try:
+        data = json.loads(response.text)
+        fallback = False
+    except json.JSONDecodeError:
+        match = re.search(r"\[.*\]", response.text, re.DOTALL)
+        if not match:
+            raise ValueError("LLM batch output is not a JSON array.")
+        data = json.loads(match.group(0))
+        fallback = True
+    _record_usage(
+        response, PROMPT_STYLE, time.perf_counter() - started, fallback, len(user_texts)
+    )
+    if not isinstance(data, list) or len(data) != len(user_texts):
+        raise ValueError("LLM batch output does not contain one plan per request.")
+    return [_plan_from_data(item) for item in data]
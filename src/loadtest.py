@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# The load test runs fully offline against a scratch database, so it provides
+# its own settings before the package config is imported.
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="loadtest-")
+atexit.register(shutil.rmtree, _SCRATCH_DIR, ignore_errors=True)
+os.environ.setdefault("GEMINI_API_KEY", "load-test-fake-key")
+os.environ.setdefault("DB_PATH", os.path.join(_SCRATCH_DIR, "load.db"))
+os.environ.setdefault("LOG_DIR", os.path.join(_SCRATCH_DIR, "logs"))
+os.environ.setdefault("REPORTS_DIR", os.path.join(_SCRATCH_DIR, "reports"))
+os.environ.setdefault("TENANT_DB_DIR", os.path.join(_SCRATCH_DIR, "tenants"))
+
+from . import agent, api_server  # noqa: E402
+from .fake_llm import install_fake_model  # noqa: E402
+
+SCENARIO: List[Tuple[str, str, Dict]] = [
+    ("POST", "/v1/requests", {"text": "Add an expense of 45000 VND for lunch today"}),
+    ("GET", "/v1/expenses?limit=20", {}),
+    ("POST", "/v1/actions", {"actions": [
+        {"type": "add_expense", "params": {"amount": 30000, "category": "Transport"}},
+    ]}),
+    ("GET", "/v1/bills", {}),
+    ("POST", "/v1/requests", {"text": "Summarize my expenses for this month"}),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _tenant_header(client: int, tenants: int) -> str:
+    # Clients are spread round-robin over the tenants (1 = the default db).
+    if tenants <= 1:
+        return ""
+    return f"X-Tenant-ID: tenant{client % tenants}\r\n"
+
+
+def _start_server(port: int, workers: int) -> None:
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=lambda: asyncio.run(api_server.serve("127.0.0.1", port, workers, ready)),
+        name="api-server",
+        daemon=True,
+    )
+    thread.start()
+    if not ready.wait(timeout=10):
+        raise RuntimeError("API server did not start within 10 seconds.")
+
+
+async def _client(
+    port: int,
+    tenant_header: str,
+    counter: List[int],
+    total: int,
+    latencies: List[float],
+    errors: List[str],
+) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while counter[0] < total:
+            method, path, payload = SCENARIO[counter[0] % len(SCENARIO)]
+            counter[0] += 1
+            body = json.dumps(payload).encode("utf-8") if method == "POST" else b""
+            request = (
+                f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n{tenant_header}"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1") + body
+
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value.strip())
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+
+            status = status_line.split()[1].decode() if status_line else "000"
+            if status != "200":
+                errors.append(f"{method} {path} -> {status}")
+    finally:
+        writer.close()
+
+
+async def _run(
+    port: int, concurrency: int, total: int, tenants: int
+) -> Tuple[List[float], List[str], float]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    counter = [0]
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(port, _tenant_header(i, tenants), counter, total, latencies, errors)
+            for i in range(concurrency)
+        )
+    )
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP API with a fake LLM.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM delay (s)")
+    parser.add_argument(
+        "--llm-rate", type=float, default=0.0, help="fake LLM calls allowed per second (0 = no limit)"
+    )
+    parser.add_argument(
+        "--batch-window-ms", type=int, default=0, help="micro-batch planning window (0 = off)"
+    )
+    parser.add_argument(
+        "--tenants", type=int, default=1, help="spread clients over N tenant databases"
+    )
+    args = parser.parse_args()
+
+    model = install_fake_model(latency=args.llm_latency, rate_limit=args.llm_rate)
+    agent.enable_plan_batching(args.batch_window_ms)
+    port = _free_port()
+    _start_server(port, args.workers)
+
+    latencies, errors, elapsed = asyncio.run(
+        _run(port, args.concurrency, args.requests, args.tenants)
+    )
+    latencies.sort()
+
+    print(f"Requests:      {len(latencies)} ({len(errors)} errors)")
+    print(
+        f"Concurrency:   {args.concurrency} clients, {args.workers} worker threads, "
+        f"{args.tenants} tenant(s)"
+    )
+    print(f"Elapsed:       {elapsed:.2f}s")
+    print(f"Throughput:    {len(latencies) / elapsed if elapsed else 0:.1f} req/s")
+    print(f"Latency p50:   {_percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"Latency p99:   {_percentile(latencies, 99) * 1000:.1f} ms")
+    if latencies:
+        print(f"Latency mean:  {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"LLM calls:     {model.calls} ({model.rejected} rate-limited)")
+    for err in errors[:5]:
+        print(f"  error: {err}")
+
+
+if __name__ == "__main__":
+    main()
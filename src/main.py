@@ -1,4 +1,4 @@
-from . import db
+from . import backup, db, profiling, scheduler
 from .agent import handle_user_input
 from .config import LOG_DIR, REPORTS_DIR
 
@@ -22,10 +22,13 @@ def main():
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     db.init_db()
+    scheduler.materialize_upcoming()
 
     print("=== AI Expense & Bills Agent (Gemini, Advanced) ===")
     print("Type natural language commands to manage your expenses and bills.")
-    print("Type 'help' for examples. Type 'exit' or 'quit' to leave.\n")
+    print("Type 'help' for examples. Type 'backup' to snapshot the database.")
+    print("Type 'stats' for the database statement timings of this session.")
+    print("Type 'exit' or 'quit' to leave.\n")
 
     while True:
         user_input = input("> User: ").strip()
@@ -40,6 +43,19 @@ def main():
             print("\n" + HELP_TEXT + "\n")
             continue
 
+        if user_input.lower() == "backup":
+            try:
+                for path in backup.create_snapshot(progress=backup.print_progress):
+                    print(f"Backup written to {path}")
+            except Exception as e:
+                print(f"[Error] Backup failed: {e}")
+            print()
+            continue
+
+        if user_input.lower() == "stats":
+            print("\n" + profiling.format_stats() + "\n")
+            continue
+
         try:
             result = handle_user_input(user_text=user_input, ask_confirmation=True)
             print("\n[Plan]")
@@ -0,0 +1,85 @@
+import argparse
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Plans are executed against a scratch database; set it up before the
+# package config is imported.
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="plan-bench-")
+atexit.register(shutil.rmtree, _SCRATCH_DIR, ignore_errors=True)
+os.environ.setdefault("GEMINI_API_KEY", "plan-bench-fake-key")
+os.environ["DB_PATH"] = os.path.join(_SCRATCH_DIR, "bench.db")
+os.environ["TENANT_DB_DIR"] = os.path.join(_SCRATCH_DIR, "tenants")
+os.environ["LOG_DIR"] = os.path.join(_SCRATCH_DIR, "logs")
+os.environ["REPORTS_DIR"] = os.path.join(_SCRATCH_DIR, "reports")
+
+from .actions import execute_actions, normalize_actions  # noqa: E402
+from .safety import validate_actions  # noqa: E402
+
+# Shaped like planner output: strings where numbers belong, blank fields,
+# extra keys the model made up.
+SAMPLE_ACTIONS: List[Dict[str, Any]] = [
+    {"type": "add_expense", "params": {
+        "amount": "45,000", "currency": "VND", "category": "Food",
+        "description": "lunch", "date": "2026-10-19",
+    }},
+    {"type": "add_expense", "params": {"amount": 30000, "category": " Transport ", "note": "x"}},
+    {"type": "summarize_expenses", "params": {"period": "This_Month"}},
+    {"type": "list_expenses", "params": {"limit": "20"}},
+    {"type": "add_bill", "params": {
+        "name": "Electricity", "amount": 800000, "due_date": "2026-12-10", "notes": "",
+    }},
+    {"type": "list_bills", "params": {"include_paid": "false"}},
+    {"type": "upcoming_bills", "params": {"days": 30.0}},
+    {"type": "set_budget", "params": {"category": "Food", "amount": "3000000", "month": "2026-10"}},
+    {"type": "budget_status", "params": {}},
+    {"type": "plan_savings_goal", "params": {
+        "target_amount": 20000000, "current_savings": "5000000", "deadline": "2027-06-30",
+    }},
+]
+
+
+def build_plan(size: int) -> List[Dict[str, Any]]:
+    return [SAMPLE_ACTIONS[i % len(SAMPLE_ACTIONS)] for i in range(size)]
+
+
+def best_of(repeats: int, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark plan validation against plan execution."
+    )
+    parser.add_argument("--actions", type=int, default=1000, help="actions per plan")
+    parser.add_argument("--repeats", type=int, default=20, help="validation runs (best is kept)")
+    args = parser.parse_args()
+
+    plan = build_plan(args.actions)
+    type_check = best_of(args.repeats, validate_actions, plan)
+    validation = best_of(args.repeats, normalize_actions, plan)
+    # The plan writes rows, so it is executed once; execute_actions
+    # includes its own validation pass.
+    execution = best_of(1, execute_actions, plan)
+
+    print(f"Plan of {len(plan)} actions:")
+    print(f"- type check only:     {type_check * 1000:8.3f} ms")
+    print(
+        f"- schema validation:   {validation * 1000:8.3f} ms "
+        f"({validation / len(plan) * 1e6:.2f} us/action)"
+    )
+    print(f"- execution (scratch): {execution * 1000:8.3f} ms")
+    if execution:
+        print(f"- validation share:    {validation / execution * 100:8.2f} % of execution")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from . import llm_client
+
+Plan = Tuple[str, List[Dict[str, Any]]]
+
+
+class MicroBatchPlanner:
+    # Collects planning requests that arrive within a short window and plans
+    # them with a single LLM call, so concurrent users share one request
+    # against the rate limit. Callers block on their own future as before.
+
+    def __init__(self, window_ms: int = 100, max_batch: int = 16, workers: int = 4):
+        self.window = max(window_ms, 0) / 1000.0
+        self.max_batch = max(max_batch, 1)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        # LLM calls run on a pool so the next window keeps collecting while
+        # a batch is in flight.
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner")
+        self._thread = threading.Thread(target=self._collect, name="plan-batcher", daemon=True)
+        self._thread.start()
+        self.fallbacks = 0
+
+    def plan(self, user_text: str) -> Plan:
+        future: Future = Future()
+        self._queue.put((user_text, future))
+        return future.result()
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if len(batch) == 1:
+                self._pool.submit(self._plan_single, *batch[0])
+            else:
+                self._pool.submit(self._plan_batch, batch)
+
+    def _plan_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        try:
+            plans = llm_client.get_actions_batch_from_llm([text for text, _ in batch])
+        except ValueError:
+            # The model did not return one plan per request: plan each one
+            # on its own instead of failing the whole batch.
+            self.fallbacks += 1
+            for text, future in batch:
+                self._plan_single(text, future)
+            return
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), plan in zip(batch, plans):
+            future.set_result(plan)
+
+    @staticmethod
+    def _plan_single(user_text: str, future: Future) -> None:
+        try:
+            future.set_result(llm_client.get_actions_from_llm(user_text))
+        except Exception as e:
+            future.set_exception(e)
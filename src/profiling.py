@@ -0,0 +1,311 @@
+import argparse
+import cProfile
+import json
+import pstats
+import random
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .config import DB_SLOW_QUERY_MS, LOG_DIR, PROFILE_SAMPLE_RATE
+
+SLOW_QUERY_LOG = "slow_queries.log"
+PROFILE_DIR = LOG_DIR / "profiles"
+# Statements EXPLAIN QUERY PLAN can describe (not PRAGMA, DDL, BEGIN...).
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+_UNSAFE_LABEL = re.compile(r"[^A-Za-z0-9_-]+")
+
+# Normalized statement -> [calls, seconds, max seconds, rows, params shape].
+# Fetch time and fetched rows are added to the statement that produced them;
+# the shape is taken from the first call (computing it every time costs more
+# than the bookkeeping itself).
+_stats: Dict[str, list] = {}
+_stats_lock = threading.Lock()
+_slow_log_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def params_shape(params: Any) -> str:
+    # Types only, never values: "(str, float, NoneType)", runs collapsed
+    # ("int x 40") so long IN lists stay readable.
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    runs: List[list] = []
+    for value in params:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return "(" + ", ".join(name if n == 1 else f"{name} x {n}" for name, n in runs) + ")"
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: Any) -> List[str]:
+    # EXPLAIN QUERY PLAN lines, indented by depth. A plain cursor is used so
+    # the EXPLAIN is not itself instrumented.
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    depth: Dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def _record(sql: str, shape: Callable[[], str], seconds: float, rows: int) -> list:
+    key = normalize_sql(sql)
+    with _stats_lock:
+        entry = _stats.get(key)
+        if entry is None:
+            entry = _stats[key] = [0, 0.0, 0.0, 0, shape()]
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+        entry[3] += rows
+    return entry
+
+
+def _log_slow(conn, sql: str, params: Any, shape: str, seconds: float, rows: int) -> None:
+    entry = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "tenant": getattr(conn, "tenant", None),
+        "duration_ms": round(seconds * 1000, 3),
+        "rows": rows,
+        "sql": normalize_sql(sql),
+        "params": shape,
+        "plan": query_plan(conn, sql, params),
+    }
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    with _slow_log_lock, (LOG_DIR / SLOW_QUERY_LOG).open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Times every statement (execution plus the fetch that reads its rows)
+    # and logs the ones slower than DB_SLOW_QUERY_MS.
+
+    _pending: Optional[list] = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._executed(
+                sql, parameters, partial(params_shape, parameters), time.perf_counter() - started
+            )
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            first = seq_of_parameters[0] if seq_of_parameters else ()
+            count = len(seq_of_parameters)
+            self._executed(
+                sql,
+                first,
+                lambda: f"{count} x {params_shape(first)}",
+                time.perf_counter() - started,
+            )
+
+    def _executed(self, sql, params, shape: Callable[[], str], seconds: float) -> None:
+        rows = max(self.rowcount, 0) if self.description is None else 0
+        entry = _record(sql, shape, seconds, rows)
+        if self.description is None:
+            self._pending = None
+            self._check_slow(sql, params, shape, seconds, rows)
+        else:
+            # Rows are read by the first fetch; it completes the timing.
+            self._pending = [entry, sql, params, shape, seconds]
+
+    def _fetched(self, seconds: float, rows: int) -> None:
+        entry, sql, params, shape, executed = self._pending
+        self._pending = None
+        with _stats_lock:
+            entry[1] += seconds
+            if executed + seconds > entry[2]:
+                entry[2] = executed + seconds
+            entry[3] += rows
+        self._check_slow(sql, params, shape, executed + seconds, rows)
+
+    def _check_slow(self, sql, params, shape: Callable[[], str], seconds: float, rows: int) -> None:
+        if DB_SLOW_QUERY_MS > 0 and seconds * 1000 >= DB_SLOW_QUERY_MS:
+            try:
+                _log_slow(self.connection, sql, params, shape(), seconds, rows)
+            except OSError:
+                pass
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        if self._pending is not None:
+            self._fetched(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._pending is not None:
+            self._fetched(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        if self._pending is not None:
+            self._fetched(time.perf_counter() - started, len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # sqlite3.connect(factory=...) target; Connection.execute goes through
+    # cursor(), so both cursor and shortcut statements are covered.
+    tenant: Optional[str] = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+
+def stats() -> List[Dict[str, Any]]:
+    # Per-statement totals of this process, slowest in total first.
+    with _stats_lock:
+        items = [(sql, list(entry)) for sql, entry in _stats.items()]
+    rows = [
+        {
+            "sql": sql,
+            "calls": calls,
+            "total_ms": seconds * 1000,
+            "mean_ms": seconds * 1000 / calls if calls else 0.0,
+            "max_ms": longest * 1000,
+            "rows": rows,
+            "params": shape,
+        }
+        for sql, (calls, seconds, longest, rows, shape) in items
+    ]
+    rows.sort(key=lambda r: -r["total_ms"])
+    return rows
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_stats(limit: int = 20, width: int = 90) -> str:
+    rows = stats()
+    if not rows:
+        return "No database statements recorded."
+    lines = [f"{'calls':>7}{'total ms':>11}{'mean ms':>9}{'max ms':>9}{'rows':>9}  statement"]
+    for r in rows[:limit]:
+        sql = r["sql"] if len(r["sql"]) <= width else r["sql"][: width - 3] + "..."
+        lines.append(
+            f"{r['calls']:>7}{r['total_ms']:>11.1f}{r['mean_ms']:>9.3f}{r['max_ms']:>9.2f}"
+            f"{r['rows']:>9}  {sql}"
+        )
+    if len(rows) > limit:
+        lines.append(f"... {len(rows) - limit} more statement(s)")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profile_request(label: Optional[str] = None) -> Iterator[None]:
+    # Runs a PROFILE_SAMPLE_RATE fraction of requests under cProfile and
+    # dumps each profile to logs/profiles/ (read with --profiles).
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is active (on newer Pythons it may be in another
+        # thread); skip this sample.
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        name = _UNSAFE_LABEL.sub("_", label or "request")[:40]
+        profiler.dump_stats(str(PROFILE_DIR / f"{stamp}-{name}.prof"))
+
+
+def summarize_slow_log(limit: int = 20) -> None:
+    log_file = LOG_DIR / SLOW_QUERY_LOG
+    if not log_file.exists():
+        print(f"No slow queries logged ({log_file} does not exist).")
+        return
+    by_sql: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with log_file.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            by_sql[entry["sql"]].append(entry)
+
+    ranked = sorted(by_sql.items(), key=lambda item: -sum(e["duration_ms"] for e in item[1]))
+    print(f"{len(by_sql)} slow statement(s) in {log_file}:")
+    for sql, entries in ranked[:limit]:
+        durations = [e["duration_ms"] for e in entries]
+        last = entries[-1]
+        print(
+            f"\n{len(entries)}x  median {statistics.median(durations):.1f} ms, "
+            f"max {max(durations):.1f} ms, last {last['timestamp']} ({last['rows']} rows)"
+        )
+        print(f"  {sql}")
+        print(f"  params: {last['params']}")
+        for plan_line in last["plan"]:
+            print(f"    {plan_line}")
+
+
+def summarize_profiles(limit: int = 25) -> None:
+    files = sorted(PROFILE_DIR.glob("*.prof")) if PROFILE_DIR.exists() else []
+    if not files:
+        print(f"No profiles in {PROFILE_DIR} (set PROFILE_SAMPLE_RATE to record some).")
+        return
+    merged = pstats.Stats(str(files[0]))
+    for path in files[1:]:
+        merged.add(str(path))
+    print(f"{len(files)} profiled request(s) in {PROFILE_DIR}:")
+    merged.sort_stats("cumulative").print_stats(limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize the slow-query log and sampled request profiles."
+    )
+    parser.add_argument("--limit", type=int, default=20, help="statements / functions to show")
+    parser.add_argument(
+        "--profiles", action="store_true", help="merge the sampled cProfile dumps instead"
+    )
+    args = parser.parse_args()
+    if args.profiles:
+        summarize_profiles(args.limit)
+    else:
+        summarize_slow_log(args.limit)
+
+
+if __name__ == "__main__":
+    main()
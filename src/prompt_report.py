@@ -0,0 +1,97 @@
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from . import llm_client
+from .config import LOG_DIR
+
+SAMPLE_REQUESTS = [
+    "Add an expense of 45000 VND for lunch today",
+    "Show me a summary of my expenses for this month",
+    "Add an electricity bill of 800000 VND due on 2025-12-10",
+    "List my unpaid bills",
+    "Help me save 20000000 VND by June 2026, I already have 5000000 VND",
+    "Set a food budget of 3 million VND per month",
+    "My rent is 6 million every month on the 5th",
+    "Xoá chi tiêu số 12",
+]
+
+
+def measure_prompt_tokens(requests: List[str]) -> Dict[str, float]:
+    # Average prompt size per style, counted by the model's tokenizer.
+    averages: Dict[str, float] = {}
+    for style in llm_client.PROMPT_STYLES:
+        counts = [
+            llm_client.MODEL.count_tokens(llm_client.build_contents(text, style)).total_tokens
+            for text in requests
+        ]
+        averages[style] = sum(counts) / len(counts)
+    return averages
+
+
+def summarize_usage_log() -> Dict[str, Dict[str, float]]:
+    # Per-style averages of the prompt/output tokens reported by the API.
+    totals: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "json_fallbacks": 0}
+    )
+    log_file = LOG_DIR / llm_client.USAGE_LOG
+    if not log_file.exists():
+        return {}
+    with log_file.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            row = totals[entry.get("style", "?")]
+            row["calls"] += 1
+            row["prompt_tokens"] += entry.get("prompt_tokens", 0)
+            row["output_tokens"] += entry.get("output_tokens", 0)
+            row["json_fallbacks"] += int(bool(entry.get("json_fallback")))
+    return dict(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the planner's prompt token usage.")
+    parser.add_argument(
+        "--measure",
+        action="store_true",
+        help="count prompt tokens of both prompt styles for sample requests",
+    )
+    parser.add_argument(
+        "--fake", action="store_true", help="use the offline fake model's token estimate"
+    )
+    args = parser.parse_args()
+
+    if args.measure:
+        if args.fake:
+            from .fake_llm import install_fake_model
+
+            install_fake_model(latency=0.0)
+        averages = measure_prompt_tokens(SAMPLE_REQUESTS)
+        before = averages[llm_client.PROMPT_VERBOSE]
+        after = averages[llm_client.PROMPT_COMPACT]
+        print(f"Average prompt tokens over {len(SAMPLE_REQUESTS)} sample requests:")
+        print(f"- verbose (before): {before:.0f}")
+        print(f"- compact (after):  {after:.0f}")
+        if before:
+            print(f"- reduction:        {(1 - after / before) * 100:.1f}%")
+        return
+
+    usage = summarize_usage_log()
+    if not usage:
+        print(f"No usage recorded yet in {LOG_DIR / llm_client.USAGE_LOG}.")
+        return
+    print("Recorded planner calls by prompt style:")
+    for style, row in sorted(usage.items()):
+        calls = row["calls"]
+        print(
+            f"- {style}: {calls} call(s), avg prompt {row['prompt_tokens'] / calls:.0f} tokens, "
+            f"avg output {row['output_tokens'] / calls:.0f} tokens, "
+            f"{row['json_fallbacks']} regex JSON fallback(s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import calendar
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int = 1
+    monthday: Optional[int] = None
+    weekday: Optional[int] = None
+
+
+def parse_rule(text: str) -> Rule:
+    # Accepts plain frequencies ("monthly", "weekly", ...) or an RRULE-lite
+    # string such as "FREQ=MONTHLY;INTERVAL=2;BYMONTHDAY=15" / "FREQ=WEEKLY;BYDAY=FR".
+    raw = (text or "").strip().upper()
+    if raw in FREQUENCIES:
+        return Rule(freq=raw)
+
+    parts = {}
+    for chunk in raw.split(";"):
+        if not chunk:
+            continue
+        key, sep, value = chunk.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid recurrence rule part: {chunk!r}")
+        parts[key.strip()] = value.strip()
+
+    freq = parts.pop("FREQ", "")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported recurrence frequency: {freq or text!r}")
+
+    interval = int(parts.pop("INTERVAL", "1"))
+    if interval < 1:
+        raise ValueError("Recurrence INTERVAL must be at least 1.")
+
+    monthday = None
+    if "BYMONTHDAY" in parts:
+        monthday = int(parts.pop("BYMONTHDAY"))
+        if not 1 <= monthday <= 31:
+            raise ValueError("Recurrence BYMONTHDAY must be between 1 and 31.")
+
+    weekday = None
+    if "BYDAY" in parts:
+        byday = parts.pop("BYDAY")
+        if byday not in WEEKDAYS:
+            raise ValueError(f"Unsupported recurrence BYDAY: {byday!r}")
+        weekday = WEEKDAYS.index(byday)
+
+    if parts:
+        raise ValueError(f"Unsupported recurrence rule parts: {', '.join(sorted(parts))}")
+    return Rule(freq=freq, interval=interval, monthday=monthday, weekday=weekday)
+
+
+def format_rule(rule: Rule) -> str:
+    text = f"FREQ={rule.freq};INTERVAL={rule.interval}"
+    if rule.monthday is not None:
+        text += f";BYMONTHDAY={rule.monthday}"
+    if rule.weekday is not None:
+        text += f";BYDAY={WEEKDAYS[rule.weekday]}"
+    return text
+
+
+def _add_months(d: date, months: int, day: int) -> date:
+    month_index = d.month - 1 + months
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def first_occurrence(rule: Rule, start: date) -> date:
+    if rule.freq == "WEEKLY" and rule.weekday is not None:
+        return start + timedelta(days=(rule.weekday - start.weekday()) % 7)
+    if rule.freq == "MONTHLY" and rule.monthday is not None:
+        candidate = _add_months(start, 0, rule.monthday)
+        return candidate if candidate >= start else _add_months(start, 1, rule.monthday)
+    return start
+
+
+def next_occurrence(rule: Rule, current: date, anchor: date) -> date:
+    # ``anchor`` is the first occurrence; it keeps month-end schedules
+    # (e.g. the 31st) from drifting after a short month.
+    if rule.freq == "DAILY":
+        return current + timedelta(days=rule.interval)
+    if rule.freq == "WEEKLY":
+        return current + timedelta(weeks=rule.interval)
+    day = rule.monthday or anchor.day
+    if rule.freq == "MONTHLY":
+        return _add_months(current, rule.interval, day)
+    return _add_months(current, 12 * rule.interval, day)
+
@@ -0,0 +1,236 @@
+import argparse
+import atexit
+import gzip
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+# The replay re-executes logged actions against scratch copies of the
+# databases, so it resolves the live locations first and then points the
+# package config at a scratch directory before importing it.
+load_dotenv()
+_BASE_DIR = Path(__file__).resolve().parent.parent
+LIVE_DB_PATH = Path(os.getenv("DB_PATH", str(_BASE_DIR / "expense_manager.db")))
+LIVE_TENANT_DB_DIR = Path(os.getenv("TENANT_DB_DIR", str(_BASE_DIR / "tenants")))
+LIVE_LOG = Path(os.getenv("LOG_DIR", str(_BASE_DIR / "logs"))) / "agent.log"
+
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="replay-")
+atexit.register(shutil.rmtree, _SCRATCH_DIR, ignore_errors=True)
+os.environ.setdefault("GEMINI_API_KEY", "replay-fake-key")
+# Keep the live file names so archive files next to them resolve the same way.
+os.environ["DB_PATH"] = os.path.join(_SCRATCH_DIR, LIVE_DB_PATH.name)
+os.environ["TENANT_DB_DIR"] = os.path.join(_SCRATCH_DIR, "tenants")
+os.environ["LOG_DIR"] = os.path.join(_SCRATCH_DIR, "logs")
+os.environ["REPORTS_DIR"] = os.path.join(_SCRATCH_DIR, "reports")
+
+from . import db, profiling  # noqa: E402
+from .actions import execute_actions, normalize_actions  # noqa: E402
+from .backup import backup_file  # noqa: E402
+from .results import results_to_json  # noqa: E402
+from .safety import validate_actions  # noqa: E402
+
+
+def read_log(path: Path) -> Iterator[Dict[str, Any]]:
+    # Streams agent.log entries; unreadable lines are skipped.
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(entry, dict) and isinstance(entry.get("actions"), list):
+                entry["line"] = line_no
+                yield entry
+
+
+def _live_path(tenant: str) -> Path:
+    if tenant == db.DEFAULT_TENANT:
+        return LIVE_DB_PATH
+    return LIVE_TENANT_DB_DIR / f"{tenant}.db"
+
+
+def prepare_scratch(tenant: str, source: Optional[Path] = None) -> Path:
+    # Copies a tenant's live database (or a snapshot, optionally gzipped)
+    # and its yearly archive files into the scratch directory.
+    target = Path(db.db_path_for(tenant))
+    source = source or _live_path(tenant)
+    if source.suffix == ".gz":
+        with gzip.open(source, "rb") as f_in, target.open("wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+        return target
+    if not source.exists():
+        return target
+    backup_file(source, target)
+    for archive in source.parent.glob(f"{source.stem}.expenses-*.db"):
+        backup_file(archive, target.with_name(f"{target.stem}{archive.name[len(source.stem):]}"))
+    return target
+
+
+def _normalize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Scratch paths differ from run to run; keep them out of the diff.
+    return json.loads(json.dumps(records, ensure_ascii=False).replace(_SCRATCH_DIR, "<scratch>"))
+
+
+def replay(
+    entries: Iterator[Dict[str, Any]],
+    *,
+    snapshot: Optional[Path] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    # Re-executes every logged action one at a time, timing each one.
+    # Returns per-action latencies and the results of every entry.
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    outputs: List[Dict[str, Any]] = []
+    prepared = set()
+    skipped = errors = 0
+
+    started = time.perf_counter()
+    for entry in entries:
+        if limit is not None and len(outputs) >= limit:
+            break
+        tenant = entry.get("tenant") or db.DEFAULT_TENANT
+        try:
+            validate_actions(entry["actions"])
+            actions = normalize_actions(entry["actions"])
+            with db.use_tenant(tenant):
+                if tenant not in prepared:
+                    prepare_scratch(tenant, snapshot if tenant == db.DEFAULT_TENANT else None)
+                    prepared.add(tenant)
+        except ValueError:
+            skipped += 1
+            continue
+
+        results: List[Dict[str, Any]] = []
+        with db.use_tenant(tenant):
+            for action in actions:
+                action_started = time.perf_counter()
+                try:
+                    records = results_to_json(execute_actions([action]))
+                except Exception as e:
+                    errors += 1
+                    records = [{"kind": "error", "text": f"{type(e).__name__}: {e}"}]
+                latencies[str(action.get("type"))].append(time.perf_counter() - action_started)
+                results.extend(records)
+        outputs.append(
+            {"line": entry["line"], "tenant": tenant, "results": _normalize(results)}
+        )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "entries": outputs,
+        "latencies": dict(latencies),
+        "elapsed": elapsed,
+        "skipped": skipped,
+        "errors": errors,
+    }
+
+
+def diff_results(
+    baseline: Dict[int, Dict[str, Any]], entries: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    # Entries (matched by log line) whose results differ from the baseline.
+    diffs = []
+    for entry in entries:
+        expected = baseline.get(entry["line"])
+        if expected is None:
+            continue
+        if expected["results"] != entry["results"]:
+            diffs.append(
+                {"line": entry["line"], "expected": expected["results"], "got": entry["results"]}
+            )
+    return diffs
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def print_report(run: Dict[str, Any]) -> None:
+    total_actions = sum(len(v) for v in run["latencies"].values())
+    elapsed = run["elapsed"]
+    print(
+        f"Replayed {len(run['entries'])} entries / {total_actions} actions in {elapsed:.2f}s "
+        f"({run['skipped']} skipped, {run['errors']} errors)"
+    )
+    if elapsed:
+        print(
+            f"Throughput: {len(run['entries']) / elapsed:.1f} entries/s, "
+            f"{total_actions / elapsed:.1f} actions/s"
+        )
+    print(f"{'action':<24}{'count':>7}{'mean ms':>10}{'p50 ms':>9}{'p99 ms':>9}{'total ms':>11}")
+    rows = sorted(run["latencies"].items(), key=lambda item: -sum(item[1]))
+    for atype, values in rows:
+        values = sorted(values)
+        print(
+            f"{atype:<24}{len(values):>7}{statistics.mean(values) * 1000:>10.2f}"
+            f"{_percentile(values, 50) * 1000:>9.2f}{_percentile(values, 99) * 1000:>9.2f}"
+            f"{sum(values) * 1000:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay logged actions against a scratch copy of the database."
+    )
+    parser.add_argument("--log", type=Path, default=LIVE_LOG, help="agent.log to replay")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help="start the default tenant from this database or .db.gz snapshot "
+        "(default: a copy of the live database)",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="replay at most N entries")
+    parser.add_argument("--save", type=Path, help="write the results as JSON Lines (a baseline)")
+    parser.add_argument("--compare", type=Path, help="diff the results against a saved baseline")
+    parser.add_argument("--show", type=int, default=5, help="differences to print")
+    parser.add_argument(
+        "--db-stats", type=int, default=0, metavar="N", help="print the N costliest SQL statements"
+    )
+    args = parser.parse_args()
+
+    if not args.log.exists():
+        parser.error(f"No log file at {args.log}.")
+
+    run = replay(read_log(args.log), snapshot=args.db, limit=args.limit)
+    print_report(run)
+    if args.db_stats:
+        print()
+        print(profiling.format_stats(args.db_stats))
+
+    if args.save:
+        with args.save.open("w", encoding="utf-8") as f:
+            for entry in run["entries"]:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"Results saved to {args.save}.")
+
+    if args.compare:
+        with args.compare.open(encoding="utf-8") as f:
+            baseline = {e["line"]: e for e in map(json.loads, filter(str.strip, f))}
+        diffs = diff_results(baseline, run["entries"])
+        print(f"{len(diffs)} of {len(run['entries'])} entries differ from {args.compare}.")
+        for diff in diffs[: args.show]:
+            print(f"- line {diff['line']}:")
+            print(f"    expected: {json.dumps(diff['expected'], ensure_ascii=False)}")
+            print(f"    got:      {json.dumps(diff['got'], ensure_ascii=False)}")
+        if diffs:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
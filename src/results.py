@@ -0,0 +1,466 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+# Typed results returned by the action handlers. Each result keeps the data
+# it was built from and only renders its text form when ``text`` is first
+# read, so callers that display tables (web UI) or JSON (API, batch) never pay
+# for string formatting. ``panel`` tells UIs where a result belongs.
+
+PANEL_EXPENSES = "expenses"
+PANEL_BILLS = "bills"
+PANEL_SAVINGS = "savings"
+PANEL_HEALTH = "health"
+PANEL_BUDGET = "budget"
+PANEL_REPORT = "report"
+PANEL_OTHER = "other"
+
+
+class ActionResult:
+    __slots__ = ("_text",)
+    kind = "result"
+    panel = PANEL_OTHER
+
+    def __init__(self):
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.render()
+        return self._text
+
+    def render(self) -> str:
+        raise NotImplementedError
+
+    def fields(self) -> Dict[str, Any]:
+        return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"kind": self.kind, "panel": self.panel, "text": self.text}
+        data.update(self.fields())
+        return data
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.kind}>"
+
+
+class Message(ActionResult):
+    __slots__ = ("message", "ok", "panel")
+    kind = "message"
+
+    def __init__(self, message: str, ok: bool = True, panel: str = PANEL_OTHER):
+        super().__init__()
+        self.message = message
+        self.ok = ok
+        self.panel = panel
+
+    def render(self) -> str:
+        return self.message
+
+    def fields(self) -> Dict[str, Any]:
+        return {"ok": self.ok}
+
+
+class TableResult(ActionResult):
+    # Base for listings: rows stay as database rows until a page is requested.
+    __slots__ = ("rows", "empty_message")
+    columns: Sequence[str] = ()
+
+    def __init__(self, rows: Sequence[Any], empty_message: str):
+        super().__init__()
+        self.rows = rows
+        self.empty_message = empty_message
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def page(self, number: int, size: int) -> List[Dict[str, Any]]:
+        start = max(number, 0) * size
+        return [{c: r[c] for c in self.columns} for r in self.rows[start:start + size]]
+
+    def fields(self) -> Dict[str, Any]:
+        return {"columns": list(self.columns), "rows": self.page(0, len(self.rows))}
+
+
+class ExpenseAdded(ActionResult):
+    __slots__ = ("expense_id", "amount", "currency", "category", "description")
+    kind = "expense_added"
+
+    def __init__(self, expense_id, amount, currency, category, description):
+        super().__init__()
+        self.expense_id = expense_id
+        self.amount = amount
+        self.currency = currency
+        self.category = category
+        self.description = description
+
+    def render(self) -> str:
+        return (
+            f"Added expense #{self.expense_id}: {self.amount} {self.currency}, "
+            f"category='{self.category}', description='{self.description}'."
+        )
+
+    def fields(self) -> Dict[str, Any]:
+        return {
+            "expense_id": self.expense_id,
+            "amount": self.amount,
+            "currency": self.currency,
+            "category": self.category,
+            "description": self.description,
+        }
+
+
+class ExpenseList(TableResult):
+    __slots__ = ()
+    kind = "expense_list"
+    panel = PANEL_EXPENSES
+    columns = ("id", "date", "amount", "currency", "category", "description")
+
+    def render(self) -> str:
+        if not self.rows:
+            return self.empty_message
+        lines = ["Recent expenses:"]
+        for r in self.rows:
+            lines.append(
+                f"- #{r['id']} | {r['date']} | {r['amount']} {r['currency']} | "
+                f"{r['category'] or 'N/A'} | {r['description'] or ''}"
+            )
+        return "\n".join(lines)
+
+
+class ExpenseSummary(ActionResult):
+    __slots__ = ("period", "count", "total", "by_category")
+    kind = "expense_summary"
+    panel = PANEL_EXPENSES
+
+    def __init__(self, period: str, count: int, total: float, by_category: Dict[str, float]):
+        super().__init__()
+        self.period = period
+        self.count = count
+        self.total = total
+        self.by_category = by_category
+
+    def render(self) -> str:
+        if not self.count:
+            return f"No expenses found for period '{self.period}'."
+        lines = [
+            f"Expense summary (period='{self.period}'):",
+            f"- Number of expenses: {self.count}",
+            f"- Total amount: {self.total:.0f} VND",
+            "- By category:",
+        ]
+        for cat, value in self.by_category.items():
+            lines.append(f"  * {cat}: {value:.0f} VND")
+        return "\n".join(lines)
+
+    def fields(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "count": self.count,
+            "total": self.total,
+            "by_category": self.by_category,
+        }
+
+
+class BillAdded(ActionResult):
+    __slots__ = ("bill_id", "name", "amount", "currency", "due_date")
+    kind = "bill_added"
+
+    def __init__(self, bill_id, name, amount, currency, due_date):
+        super().__init__()
+        self.bill_id = bill_id
+        self.name = name
+        self.amount = amount
+        self.currency = currency
+        self.due_date = due_date
+
+    def render(self) -> str:
+        return (
+            f"Added bill #{self.bill_id}: {self.name}, {self.amount} {self.currency}, "
+            f"due {self.due_date}."
+        )
+
+    def fields(self) -> Dict[str, Any]:
+        return {
+            "bill_id": self.bill_id,
+            "name": self.name,
+            "amount": self.amount,
+            "currency": self.currency,
+            "due_date": self.due_date,
+        }
+
+
+class RecurringBillAdded(ActionResult):
+    __slots__ = ("template_id", "name", "amount", "currency", "rule", "next_due", "scheduled")
+    kind = "recurring_bill_added"
+    panel = PANEL_BILLS
+
+    def __init__(self, template_id, name, amount, currency, rule, next_due, scheduled):
+        super().__init__()
+        self.template_id = template_id
+        self.name = name
+        self.amount = amount
+        self.currency = currency
+        self.rule = rule
+        self.next_due = next_due
+        self.scheduled = scheduled
+
+    def render(self) -> str:
+        return (
+            f"Added recurring bill template #{self.template_id}: {self.name}, "
+            f"{self.amount} {self.currency}, {self.rule}, next due {self.next_due} "
+            f"({self.scheduled} upcoming bill(s) scheduled)."
+        )
+
+    def fields(self) -> Dict[str, Any]:
+        return {
+            "template_id": self.template_id,
+            "name": self.name,
+            "amount": self.amount,
+            "currency": self.currency,
+            "rule": self.rule,
+            "next_due": self.next_due,
+            "scheduled": self.scheduled,
+        }
+
+
+class BillList(TableResult):
+    __slots__ = ("title",)
+    kind = "bill_list"
+    panel = PANEL_BILLS
+    columns = ("id", "name", "amount", "currency", "due_date", "is_paid")
+
+    def __init__(self, title: str, rows: Sequence[Any], empty_message: str):
+        super().__init__(rows, empty_message)
+        self.title = title
+
+    def render(self) -> str:
+        if not self.rows:
+            return self.empty_message
+        lines = [self.title]
+        for r in self.rows:
+            status = "Paid" if r["is_paid"] else "Unpaid"
+            lines.append(
+                f"- #{r['id']} | {r['name']} | {r['amount']} {r['currency']} | "
+                f"Due: {r['due_date']} | {status}"
+            )
+        return "\n".join(lines)
+
+    def fields(self) -> Dict[str, Any]:
+        data = super().fields()
+        data["title"] = self.title
+        return data
+
+
+class BillSummary(ActionResult):
+    __slots__ = ("include_paid", "count", "total", "unpaid_count")
+    kind = "bill_summary"
+    panel = PANEL_BILLS
+
+    def __init__(self, include_paid: bool, count: int, total: float, unpaid_count: int):
+        super().__init__()
+        self.include_paid = include_paid
+        self.count = count
+        self.total = total
+        self.unpaid_count = unpaid_count
+
+    def render(self) -> str:
+        if not self.count:
+            return "There are no bills to summarize."
+        return "\n".join([
+            "Bill summary:",
+            f"- Total bills (include_paid={self.include_paid}): {self.count}",
+            f"- Total amount (all bills): {self.total:.0f} VND",
+            f"- Number of unpaid bills: {self.unpaid_count}",
+        ])
+
+    def fields(self) -> Dict[str, Any]:
+        return {
+            "include_paid": self.include_paid,
+            "count": self.count,
+            "total": self.total,
+            "unpaid_count": self.unpaid_count,
+        }
+
+
+class ReportCreated(ActionResult):
+    __slots__ = ("path", "period", "count")
+    kind = "report"
+    panel = PANEL_REPORT
+
+    def __init__(self, path: str, period: str, count: int):
+        super().__init__()
+        self.path = path
+        self.period = period
+        self.count = count
+
+    def render(self) -> str:
+        return f"Created report at: {self.path}"
+
+    def fields(self) -> Dict[str, Any]:
+        return {"path": self.path, "period": self.period, "count": self.count}
+
+
+class SavingsPlan(ActionResult):
+    __slots__ = (
+        "target", "current", "remaining", "deadline", "days_left",
+        "per_month", "per_week", "per_day",
+    )
+    kind = "savings_plan"
+    panel = PANEL_SAVINGS
+
+    def __init__(self, target, current, remaining, deadline, days_left, per_month, per_week, per_day):
+        super().__init__()
+        self.target = target
+        self.current = current
+        self.remaining = remaining
+        self.deadline = deadline
+        self.days_left = days_left
+        self.per_month = per_month
+        self.per_week = per_week
+        self.per_day = per_day
+
+    def render(self) -> str:
+        lines = [
+            "Savings goal plan:",
+            f"- Target amount: {self.target:.0f} VND",
+            f"- Current savings: {self.current:.0f} VND",
+            f"- Remaining amount: {self.remaining:.0f} VND",
+            f"- Deadline: {self.deadline} (in {self.days_left} days)",
+            f"- Suggested saving per month: {self.per_month:.0f} VND",
+            f"- Suggested saving per week: {self.per_week:.0f} VND",
+            f"- Suggested saving per day: {self.per_day:.0f} VND",
+        ]
+        if self.per_month <= 0:
+            lines.append("- You already reached or exceeded the target amount!")
+        elif self.per_month > self.target * 0.5:
+            lines.append(
+                "- Warning: required monthly saving is very high compared to the target; "
+                "you may need to extend the deadline or lower the goal."
+            )
+        return "\n".join(lines)
+
+    def fields(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in SavingsPlan.__slots__}
+
+
+class HealthCheck(ActionResult):
+    __slots__ = ("period", "total", "needs", "wants", "other")
+    kind = "health_check"
+    panel = PANEL_HEALTH
+
+    def __init__(self, period: str, total: float, needs: float, wants: float, other: float):
+        super().__init__()
+        self.period = period
+        self.total = total
+        self.needs = needs
+        self.wants = wants
+        self.other = other
+
+    def pct(self, value: float) -> float:
+        return (value / self.total * 100.0) if self.total > 0 else 0.0
+
+    def render(self) -> str:
+        needs_pct = self.pct(self.needs)
+        wants_pct = self.pct(self.wants)
+        lines = [
+            f"Spending health check (period='{self.period}')",
+            f"- Total spending: {self.total:.0f} VND",
+            f"- Needs: {self.needs:.0f} VND ({needs_pct:.1f}%)",
+            f"- Wants: {self.wants:.0f} VND ({wants_pct:.1f}%)",
+            f"- Other: {self.other:.0f} VND ({self.pct(self.other):.1f}%)",
+            "",
+            "Guideline (50/30/20 rule):",
+            "- Needs ~ 50% of income, Wants ~ 30%, Savings/Debt repayment ~ 20%.",
+        ]
+
+        if needs_pct > 55:
+            lines.append("- Your Needs spending is above 50%. Consider optimising fixed costs if possible.")
+        elif needs_pct < 40:
+            lines.append("- Your Needs spending is relatively low; this may allow more room for savings.")
+
+        if wants_pct > 35:
+            lines.append("- Your Wants spending is quite high. You may want to reduce optional purchases.")
+        elif wants_pct < 20:
+            lines.append("- Your Wants spending is modest; good job keeping lifestyle expenses under control.")
+
+        lines.append(
+            "- Note: this is a rough check based only on recorded expenses; "
+            "it does not include your savings or income information."
+        )
+        return "\n".join(lines)
+
+    def fields(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "total": self.total,
+            "needs": self.needs,
+            "wants": self.wants,
+            "other": self.other,
+        }
+
+
+class BudgetAlert(ActionResult):
+    __slots__ = ("category", "month", "threshold", "spent", "limit", "currency")
+    kind = "budget_alert"
+    panel = PANEL_BUDGET
+
+    def __init__(self, category, month, threshold, spent, limit, currency):
+        super().__init__()
+        self.category = category
+        self.month = month
+        self.threshold = threshold
+        self.spent = spent
+        self.limit = limit
+        self.currency = currency
+
+    def render(self) -> str:
+        return (
+            f"Budget alert: {self.category} spending for {self.month} has reached "
+            f"{self.threshold:.0%} of its budget ({self.spent:.0f} / {self.limit:.0f} {self.currency})."
+        )
+
+    def fields(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in BudgetAlert.__slots__}
+
+
+class BudgetStatus(TableResult):
+    __slots__ = ("month",)
+    kind = "budget_status"
+    panel = PANEL_BUDGET
+    columns = ("category", "limit_amount", "spent", "currency", "budget_month")
+
+    def __init__(self, month: str, rows: Sequence[Any]):
+        super().__init__(rows, f"No budgets are set for {month}.")
+        self.month = month
+
+    def render(self) -> str:
+        if not self.rows:
+            return self.empty_message
+        lines = [f"Budget status ({self.month}):"]
+        for r in self.rows:
+            limit = float(r["limit_amount"])
+            spent = float(r["spent"])
+            pct = spent / limit * 100.0 if limit > 0 else 0.0
+            if spent > limit:
+                state = "OVER BUDGET"
+            elif pct >= 80:
+                state = "near limit"
+            else:
+                state = "ok"
+            lines.append(
+                f"- {r['category']}: {spent:.0f} / {limit:.0f} {r['currency']} "
+                f"({pct:.1f}%, remaining {limit - spent:.0f}) | {state}"
+            )
+        return "\n".join(lines)
+
+    def fields(self) -> Dict[str, Any]:
+        data = super().fields()
+        data["month"] = self.month
+        return data
+
+
+def results_to_json(results: Sequence[ActionResult]) -> List[Dict[str, Any]]:
+    return [r.to_dict() for r in results]
@@ -1,7 +1,7 @@
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from .config import LOG_DIR
 
@@ -17,6 +17,11 @@ ALLOWED_ACTIONS = {
     "mark_bill_paid",
     "plan_savings_goal",
     "spending_health_check",
+    "add_recurring_bill",
+    "upcoming_bills",
+    "overdue_bills",
+    "set_budget",
+    "budget_status",
 }
 
 DESTRUCTIVE_ACTIONS = {
@@ -24,6 +29,20 @@ DESTRUCTIVE_ACTIONS = {
     "mark_bill_paid",
 }
 
+WRITE_ACTIONS = {
+    "add_expense",
+    "add_bill",
+    "delete_expense",
+    "mark_bill_paid",
+    "add_recurring_bill",
+    "set_budget",
+}
+
+CONFIRM_PROMPT = "prompt"
+CONFIRM_ALLOW = "allow"
+CONFIRM_DENY = "deny"
+CONFIRMATION_POLICIES = (CONFIRM_PROMPT, CONFIRM_ALLOW, CONFIRM_DENY)
+
 
 def validate_actions(actions: List[Dict[str, Any]]) -> None:
     for action in actions:
@@ -39,13 +58,22 @@ def actions_require_confirmation(actions: List[Dict[str, Any]]) -> bool:
     return False
 
 
-def log_actions(user_text: str, actions: List[Dict[str, Any]]) -> None:
+def log_actions(
+    user_text: str,
+    actions: List[Dict[str, Any]],
+    tenant: Optional[str] = None,
+    request_id: Optional[str] = None,
+) -> None:
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     entry = {
         "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
         "user_text": user_text,
         "actions": actions,
     }
+    if tenant is not None:
+        entry["tenant"] = tenant
+    if request_id is not None:
+        entry["request_id"] = request_id
     log_file: Path = LOG_DIR / "agent.log"
     with log_file.open("a", encoding="utf-8") as f:
         f.write(json.dumps(entry, ensure_ascii=False) + "\n")
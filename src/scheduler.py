@@ -0,0 +1,135 @@
+import argparse
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from . import db
+from .config import (
+    BILL_HORIZON_DAYS,
+    CHANGE_LOG_TTL_DAYS,
+    IDEMPOTENCY_TTL_DAYS,
+    SCHEDULER_INTERVAL_SECONDS,
+)
+from .recurrence import next_occurrence, parse_rule
+
+BATCH_SIZE = 200
+
+
+def materialize_upcoming(
+    horizon_days: int = BILL_HORIZON_DAYS,
+    batch_size: int = BATCH_SIZE,
+    today: Optional[date] = None,
+    template_id: Optional[int] = None,
+) -> int:
+    # Creates concrete ``bills`` rows for every recurring template occurrence
+    # due within the horizon. Templates are processed in batches, one
+    # transaction per batch; (template_id, due_date) is unique, so re-running
+    # (or two schedulers racing) never duplicates an instance. ``template_id``
+    # restricts the pass to a single template (e.g. one that was just added).
+    today = today or date.today()
+    until = today + timedelta(days=horizon_days)
+    total = 0
+
+    while True:
+        templates = db.get_due_bill_templates(
+            until=until.isoformat(), limit=batch_size, template_id=template_id
+        )
+        if not templates:
+            break
+
+        instances: List[tuple] = []
+        updates: List[tuple] = []
+        for t in templates:
+            rule = parse_rule(t["rule"])
+            anchor = date.fromisoformat(t["start_date"])
+            end = date.fromisoformat(t["end_date"]) if t["end_date"] else None
+            due = date.fromisoformat(t["next_due"])
+            while due <= until and (end is None or due <= end):
+                instances.append(
+                    (t["name"], t["amount"], t["currency"], due.isoformat(), t["notes"], t["id"])
+                )
+                due = next_occurrence(rule, due, anchor)
+            active = 0 if end is not None and due > end else 1
+            updates.append((due.isoformat(), active, t["id"]))
+
+        total += db.materialize_bills(instances, updates)
+        if len(templates) < batch_size:
+            break
+
+    return total
+
+
+def prune_idempotency_keys(ttl_days: int = IDEMPOTENCY_TTL_DAYS) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+    return db.prune_idempotency_keys(cutoff.isoformat(timespec="seconds"))
+
+
+def prune_change_log(ttl_days: int = CHANGE_LOG_TTL_DAYS) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+    return db.prune_change_log(cutoff.isoformat(timespec="seconds"))
+
+
+def run_loop(
+    interval_seconds: int = SCHEDULER_INTERVAL_SECONDS,
+    horizon_days: int = BILL_HORIZON_DAYS,
+    stop_event: Optional[threading.Event] = None,
+) -> None:
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        for tenant in db.list_tenants():
+            try:
+                with db.use_tenant(tenant):
+                    created = materialize_upcoming(horizon_days=horizon_days)
+                    prune_idempotency_keys()
+                    prune_change_log()
+                if created:
+                    print(f"[scheduler] Materialized {created} upcoming bill(s) for {tenant}.")
+            except Exception as e:
+                print(f"[scheduler] Error for {tenant}: {e}")
+        stop_event.wait(interval_seconds)
+
+
+def start_background(interval_seconds: int = SCHEDULER_INTERVAL_SECONDS) -> threading.Event:
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_loop,
+        args=(interval_seconds, BILL_HORIZON_DAYS, stop_event),
+        name="bill-scheduler",
+        daemon=True,
+    )
+    thread.start()
+    return stop_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize upcoming recurring bills.")
+    parser.add_argument(
+        "--once", action="store_true", help="run a single pass and exit (default: loop)"
+    )
+    parser.add_argument("--interval", type=int, default=SCHEDULER_INTERVAL_SECONDS)
+    parser.add_argument("--horizon-days", type=int, default=BILL_HORIZON_DAYS)
+    args = parser.parse_args()
+
+    db.init_db()
+    if args.once:
+        started = time.perf_counter()
+        created = 0
+        for tenant in db.list_tenants():
+            with db.use_tenant(tenant):
+                created += materialize_upcoming(horizon_days=args.horizon_days)
+                prune_idempotency_keys()
+                prune_change_log()
+        elapsed = time.perf_counter() - started
+        print(f"Materialized {created} upcoming bill(s) in {elapsed:.3f}s.")
+        return
+
+    print(f"Bill scheduler running every {args.interval}s (Ctrl+C to stop).")
+    try:
+        run_loop(interval_seconds=args.interval, horizon_days=args.horizon_days)
+    except KeyboardInterrupt:
+        print("Scheduler stopped.")
+
+
+if __name__ == "__main__":
+    main()
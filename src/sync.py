@@ -0,0 +1,147 @@
+import argparse
+import json
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import db
+
+BATCH_SIZE = 1000
+
+
+def _month_bounds(today: date) -> Tuple[str, str]:
+    first = today.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first.isoformat(), next_month.isoformat()
+
+
+def _category_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    # Same bucket as expense_totals_by_category: blank categories are "Other".
+    return (row.get("category") or "").strip(" ") or db.UNCATEGORIZED, row["currency"]
+
+
+class MonthlyDashboard:
+    # This month's spend per category and the unpaid-bill overview of one
+    # tenant, kept current from the change feed: the aggregate queries run
+    # once, later refreshes only apply the rows that changed since.
+
+    def __init__(self, tenant: Optional[str] = None):
+        self.tenant = tenant or db.current_tenant()
+        self._lock = threading.Lock()
+        self._seq: Optional[int] = None
+        self._today: Optional[date] = None
+        self._totals: Dict[Tuple[str, str], List[float]] = {}
+        self._bills: Dict[str, Any] = {}
+        self.full_loads = 0
+        self.applied = 0
+
+    def refresh(self, today: Optional[date] = None) -> Dict[str, Any]:
+        today = today or date.today()
+        with self._lock, db.use_tenant(self.tenant):
+            oldest, latest = db.change_log_bounds()
+            if self._seq is None or self._today != today or oldest > self._seq + 1:
+                # First use, a new day (bill windows move), or the feed was
+                # pruned past our position.
+                self._load(today)
+            elif latest > self._seq:
+                self._catch_up()
+            return self._snapshot()
+
+    def _load(self, today: date) -> None:
+        start, end = _month_bounds(today)
+        with db.read_snapshot():
+            _, self._seq = db.change_log_bounds()
+            self._totals = {
+                (r["category"], r["currency"]): [r["count"], r["total"]]
+                for r in db.expense_totals_by_category(start, end)
+            }
+            self._bills = dict(db.bill_overview(*self._bill_window(today)))
+        self._today = today
+        self.full_loads += 1
+
+    def _catch_up(self) -> None:
+        start, end = _month_bounds(self._today)
+        bills_changed = False
+        while True:
+            changes = db.changes_since(self._seq, limit=BATCH_SIZE)
+            for change in changes:
+                if change["table_name"] == "bills":
+                    bills_changed = True
+                elif change["op"] != "archive":
+                    # Archived rows moved to their year file; totals are unchanged.
+                    self._apply_expense(change, start, end)
+                self._seq = change["seq"]
+            self.applied += len(changes)
+            if len(changes) < BATCH_SIZE:
+                break
+        if bills_changed:
+            self._bills = dict(db.bill_overview(*self._bill_window(self._today)))
+
+    def _apply_expense(self, change, start: str, end: str) -> None:
+        for image, sign in ((change["old"], -1), (change["new"], 1)):
+            if not image:
+                continue
+            row = json.loads(image)
+            if not start <= row["date"] < end:
+                continue
+            key = _category_key(row)
+            bucket = self._totals.setdefault(key, [0, 0.0])
+            bucket[0] += sign
+            bucket[1] += sign * row["amount"]
+            if bucket[0] <= 0:
+                del self._totals[key]
+
+    @staticmethod
+    def _bill_window(today: date) -> Tuple[str, str]:
+        return today.isoformat(), (today + timedelta(days=7)).isoformat()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        categories = [
+            {"category": category, "currency": currency, "count": count, "total": total}
+            for (category, currency), (count, total) in self._totals.items()
+        ]
+        categories.sort(key=lambda r: -r["total"])
+        return {
+            "month": self._today.strftime("%Y-%m"),
+            "categories": categories,
+            "bills": dict(self._bills),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the change feed of a tenant database.")
+    parser.add_argument("--tenant", default=None, help="tenant database (default: the default one)")
+    parser.add_argument("--since", type=int, default=0, help="print changes after this seq")
+    parser.add_argument("--follow", action="store_true", help="keep polling for new changes")
+    parser.add_argument("--interval", type=float, default=1.0, help="poll interval in seconds")
+    args = parser.parse_args()
+
+    with db.use_tenant(args.tenant):
+        db.init_db()
+        seq = args.since
+        try:
+            while True:
+                oldest, _ = db.change_log_bounds()
+                if oldest > seq + 1:
+                    print(f"(changes {seq + 1}..{oldest - 1} were pruned)")
+                    seq = oldest - 1
+                changes = db.changes_since(seq, limit=BATCH_SIZE)
+                for change in changes:
+                    print(
+                        f"{change['seq']:>8} {change['changed_at']} {change['op']:<7} "
+                        f"{change['table_name']}#{change['row_id']} "
+                        f"{change['new'] or change['old']}"
+                    )
+                    seq = change["seq"]
+                if len(changes) == BATCH_SIZE:
+                    continue
+                if not args.follow:
+                    break
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,230 @@
-from typing import List
+import time
+import uuid
+from datetime import date
+from typing import Dict, List
 
 import streamlit as st
 
-from src import db
-from src.agent import handle_user_input
+from src import db, scheduler
 from src.config import LOG_DIR, REPORTS_DIR
+from src.jobs import FINISHED_STATES, JOB_DONE, JOB_ERROR, JobQueue
+from src.results import (
+    PANEL_BILLS,
+    PANEL_BUDGET,
+    PANEL_EXPENSES,
+    PANEL_HEALTH,
+    PANEL_OTHER,
+    PANEL_REPORT,
+    PANEL_SAVINGS,
+    ActionResult,
+    BudgetAlert,
+    Message,
+    ReportCreated,
+    TableResult,
+)
+from src.sync import MonthlyDashboard
+
+LOG_TAIL_CHUNK = 64 * 1024
+
+
+@st.cache_resource
+def init_backend() -> JobQueue:
+    # Runs once per server process instead of on every rerun.
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    db.init_db()
+    scheduler.materialize_upcoming()
+    return JobQueue(max_workers=2)
+
+
+@st.cache_data(max_entries=4)
+def _read_log_tail(max_lines: int, mtime_ns: int, size: int) -> List[str]:
+    # mtime/size are only part of the cache key: the tail is re-read when
+    # the log file changes. Only the last chunk(s) of the file are read.
+    log_file = LOG_DIR / "agent.log"
+    with log_file.open("rb") as f:
+        end = f.seek(0, 2)
+        start = end
+        data = b""
+        while start > 0 and data.count(b"\n") <= max_lines:
+            start = max(0, start - LOG_TAIL_CHUNK)
+            f.seek(start)
+            data = f.read(end - start)
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if start > 0:
+        lines = lines[1:]
+    return lines[-max_lines:]
 
 
 def read_last_logs(max_lines: int = 20) -> List[str]:
     log_file = LOG_DIR / "agent.log"
     if not log_file.exists():
         return []
-    lines = log_file.read_text(encoding="utf-8").splitlines()
-    return lines[-max_lines:]
+    stat = log_file.stat()
+    return _read_log_tail(max_lines, stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_resource
+def dashboard_feed() -> MonthlyDashboard:
+    # Shared by all sessions. Each refresh applies only the change-log
+    # entries since the last one, so writes made by other processes (the
+    # API server, the scheduler) show up too.
+    return MonthlyDashboard()
 
 
-def split_results(results: List[str]):
-    expense_summary = []
-    bill_summary = []
-    savings_plan = []
-    health_check = []
-    report_info = []
-    other = []
+PAGE_SIZES = (10, 25, 50, 100)
 
+
+def group_results(results: List[ActionResult]) -> Dict[str, List[ActionResult]]:
+    grouped: Dict[str, List[ActionResult]] = {}
     for r in results:
-        if "Expense summary" in r:
-            expense_summary.append(r)
-        elif r.startswith("Bill summary"):
-            bill_summary.append(r)
-        elif r.startswith("Savings goal plan"):
-            savings_plan.append(r)
-        elif r.startswith("Spending health check"):
-            health_check.append(r)
-        elif r.startswith("Created report at"):
-            report_info.append(r)
-        else:
-            other.append(r)
-
-    return {
-        "expense_summary": "\n".join(expense_summary) if expense_summary else "",
-        "bill_summary": "\n".join(bill_summary) if bill_summary else "",
-        "savings_plan": "\n".join(savings_plan) if savings_plan else "",
-        "health_check": "\n".join(health_check) if health_check else "",
-        "report_info": "\n".join(report_info) if report_info else "",
-        "other": other,
-    }
+        grouped.setdefault(r.panel, []).append(r)
+    return grouped
 
 
-def main():
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
-    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-    db.init_db()
+def render_table(result: TableResult, key: str) -> None:
+    # Only the visible page is converted for display; large listings are
+    # never rendered to text.
+    if not len(result):
+        st.caption(result.empty_message)
+        return
+    title = getattr(result, "title", None)
+    if title:
+        st.markdown(f"**{title}**")
+    size_col, page_col = st.columns(2)
+    size = size_col.selectbox("Rows per page", PAGE_SIZES, key=f"{key}-size")
+    pages = max((len(result) + size - 1) // size, 1)
+    page = page_col.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}-page")
+    st.dataframe(result.page(int(page) - 1, size), hide_index=True)
+    st.caption(f"{len(result)} row(s), page {int(page)} of {pages}")
+
+
+def render_result(result: ActionResult, key: str) -> None:
+    if isinstance(result, TableResult):
+        render_table(result, key)
+    elif isinstance(result, ReportCreated):
+        st.success(result.text)
+    elif isinstance(result, BudgetAlert) or (isinstance(result, Message) and not result.ok):
+        st.warning(result.text)
+    elif isinstance(result, Message):
+        st.write(result.text)
+    else:
+        st.code(result.text, language="text")
+
+
+def render_panel(title: str, results: List[ActionResult], empty_hint: str, key: str) -> None:
+    st.markdown(f"##### {title}")
+    if not results:
+        st.caption(empty_hint)
+    for i, result in enumerate(results):
+        render_result(result, f"{key}-{i}")
+
+
+def render_dashboard(queue: JobQueue) -> None:
+    st.session_state["dashboard_version"] = queue.data_version
+    data = dashboard_feed().refresh(date.today())
+    bills = data["bills"]
+
+    st.subheader("Dashboard")
+    totals: Dict[str, float] = {}
+    for row in data["categories"]:
+        totals[row["currency"]] = totals.get(row["currency"], 0.0) + row["total"]
+    spent_text = ", ".join(f"{v:,.0f} {c}" for c, v in totals.items()) or "0"
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric(f"Spent in {data['month']}", spent_text)
+    m2.metric("Unpaid bills", f"{bills['unpaid_count']} ({bills['unpaid_total']:,.0f})")
+    m3.metric("Overdue bills", bills["overdue_count"])
+    m4.metric("Due in 7 days", bills["due_soon_count"])
+    if data["categories"]:
+        st.dataframe(data["categories"], hide_index=True)
 
+
+def render_results(plan: str, results: List[ActionResult], key: str) -> None:
+    st.markdown("#### Plan")
+    st.write(plan)
+
+    grouped = group_results(results)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        render_panel(
+            "Expenses",
+            grouped.get(PANEL_EXPENSES, []),
+            "Run an expense summary or list expenses to see results here.",
+            f"{key}-expenses",
+        )
+        render_panel(
+            "Savings Goal Plan",
+            grouped.get(PANEL_SAVINGS, []),
+            "Ask for a savings goal plan to populate this section.",
+            f"{key}-savings",
+        )
+
+    with col2:
+        render_panel(
+            "Bills Overview",
+            grouped.get(PANEL_BILLS, []),
+            "Run a bill summary or list bills to see results here.",
+            f"{key}-bills",
+        )
+        render_panel(
+            "Spending Health Check",
+            grouped.get(PANEL_HEALTH, []),
+            "Ask for a spending health check to populate this section.",
+            f"{key}-health",
+        )
+
+    if grouped.get(PANEL_BUDGET):
+        render_panel("Budgets", grouped[PANEL_BUDGET], "", f"{key}-budget")
+
+    st.markdown("##### Report & Other Messages")
+    for i, result in enumerate(grouped.get(PANEL_REPORT, []) + grouped.get(PANEL_OTHER, [])):
+        render_result(result, f"{key}-other-{i}")
+
+
+@st.fragment(run_every=1.0)
+def render_job_panel(queue: JobQueue) -> None:
+    # Polls the background job once a second without rerunning the page.
+    job_id = st.session_state.get("job_id")
+    job = queue.get(job_id) if job_id else None
+    if job is None:
+        st.info("No run yet. Submit a job description on the left to see the plan and execution steps here.")
+        return
+
+    if job["status"] not in FINISHED_STATES:
+        elapsed = time.time() - job["submitted_at"]
+        progress = {"queued": 0.1, "planning": 0.4, "executing": 0.8}.get(job["status"], 0.1)
+        st.progress(progress, text=f"{job['status'].capitalize()}... ({elapsed:.0f}s)")
+        if job["plan"]:
+            st.markdown("#### Plan")
+            st.write(job["plan"])
+        return
+
+    if job["status"] == JOB_ERROR:
+        st.error(f"Error while running agent: {job['error']}")
+    else:
+        render_results(job["plan"], job["results"], key=job["id"])
+
+    pending = st.session_state.get("pending_request")
+    if job["status"] == JOB_DONE and pending and pending["request_id"] == job["request_id"]:
+        # Done: submitting the same text again is a new request.
+        del st.session_state["pending_request"]
+
+    if st.session_state.get("dashboard_version") != queue.data_version:
+        # The job wrote to the database: rerun the whole page once so the
+        # dashboard picks up the new data version.
+        st.rerun()
+
+
+def main():
     st.set_page_config(
         page_title="AI Expense & Bills Agent",
         page_icon="💰",
         layout="wide",
     )
+    queue = init_backend()
 
     header_left, header_right = st.columns([3, 1])
     with header_left:
@@ -76,6 +244,8 @@ def main():
                     for line in logs:
                         st.code(line, language="json")
 
+    render_dashboard(queue)
+
     left, right = st.columns([2, 3])
 
     with left:
@@ -101,58 +271,21 @@ def main():
             )
             run_agent = st.form_submit_button("Run agent")
 
+        if run_agent and user_text.strip():
+            # Re-submitting the same text before its job succeeded (a double
+            # click, a retry after an error) reuses the request id, so the
+            # plan's inserts are written once.
+            pending = st.session_state.get("pending_request")
+            if pending is None or pending["text"] != user_text:
+                pending = {"text": user_text, "request_id": uuid.uuid4().hex}
+                st.session_state["pending_request"] = pending
+            st.session_state["job_id"] = queue.submit(
+                user_text, request_id=pending["request_id"]
+            )
+
     with right:
         st.subheader("Execution Steps")
-
-        if run_agent and user_text.strip():
-            try:
-                result = handle_user_input(user_text=user_text, ask_confirmation=False)
-                plan = result.get("plan", "(no plan)")
-                results = result.get("results", [])
-
-                st.markdown("#### Plan")
-                st.write(plan)
-
-                grouped = split_results(results)
-
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    st.markdown("##### Expense Summary")
-                    if grouped["expense_summary"]:
-                        st.code(grouped["expense_summary"], language="text")
-                    else:
-                        st.caption("Run an expense summary to see results here.")
-
-                    st.markdown("##### Savings Goal Plan")
-                    if grouped["savings_plan"]:
-                        st.code(grouped["savings_plan"], language="text")
-                    else:
-                        st.caption("Ask for a savings goal plan to populate this section.")
-
-                with col2:
-                    st.markdown("##### Bills Overview")
-                    if grouped["bill_summary"]:
-                        st.code(grouped["bill_summary"], language="text")
-                    else:
-                        st.caption("Run a bill summary or list bills to see results here.")
-
-                    st.markdown("##### Spending Health Check")
-                    if grouped["health_check"]:
-                        st.code(grouped["health_check"], language="text")
-                    else:
-                        st.caption("Ask for a spending health check to populate this section.")
-
-                st.markdown("##### Report & Other Messages")
-                if grouped["report_info"]:
-                    st.success(grouped["report_info"])
-                for msg in grouped["other"]:
-                    st.write(f"- {msg}")
-
-            except Exception as e:
-                st.error(f"Error while running agent: {e}")
-        else:
-            st.info("No run yet. Submit a job description on the left to see the plan and execution steps here.")
+        render_job_panel(queue)
 
 
 if __name__ == "__main__":